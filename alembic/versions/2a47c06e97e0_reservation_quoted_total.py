@@ -0,0 +1,29 @@
+"""reservation quoted total
+
+Revision ID: 2a47c06e97e0
+Revises: 41715f0cf3ab
+Create Date: 2026-03-06 09:12:40.518226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a47c06e97e0'
+down_revision: Union[str, Sequence[str], None] = '41715f0cf3ab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable: existing stays have no quote and keep billing nights * per_night_rate.
+    op.add_column('reservation', sa.Column('quoted_total', sa.Numeric(precision=10, scale=2), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('reservation', 'quoted_total')
@@ -0,0 +1,34 @@
+"""reservation room index
+
+Revision ID: 3725604f6bbb
+Revises: 2a47c06e97e0
+Create Date: 2026-03-09 10:27:15.284913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3725604f6bbb'
+down_revision: Union[str, Sequence[str], None] = '2a47c06e97e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /reservations?room_id= does not filter out cancelled stays, so the partial index never matched it.
+    # The unconditional index serves that listing and every query the partial one did.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reservation_room_check_in', 'reservation', ['room_id', 'check_in', 'check_out'], postgresql_concurrently=True)
+        op.drop_index('ix_reservation_room_dates', table_name='reservation', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reservation_room_dates', 'reservation', ['room_id', 'check_in', 'check_out'], postgresql_where=sa.text("status <> 'CANCELLED'"), postgresql_concurrently=True)
+        op.drop_index('ix_reservation_room_check_in', table_name='reservation', postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""secondary indexes
+
+Revision ID: 39b78f63042d
+Revises: 4e00d3d39d4b
+Create Date: 2026-02-16 11:21:44.903517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '39b78f63042d'
+down_revision: Union[str, Sequence[str], None] = '4e00d3d39d4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps the tables writable while the indexes build; it cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_rooms_active_status', 'rooms', ['status'], postgresql_where=sa.text('is_active'), postgresql_concurrently=True)
+        op.create_index('ix_rooms_active_room_number', 'rooms', ['room_number'], postgresql_where=sa.text('is_active'), postgresql_concurrently=True)
+        op.create_index('ix_reservation_guest_id', 'reservation', ['guest_id'], postgresql_concurrently=True)
+        op.create_index('ix_reservation_check_out_status', 'reservation', ['check_out', 'status'], postgresql_concurrently=True)
+        op.create_index('ix_reservation_room_dates', 'reservation', ['room_id', 'check_in', 'check_out'], postgresql_where=sa.text("status <> 'CANCELLED'"), postgresql_concurrently=True)
+        op.create_index('ix_bills_paid_id', 'bills', ['paid', 'id'], postgresql_concurrently=True)
+        op.create_index('ix_guests_email_pattern', 'guests', ['email'], postgresql_ops={'email': 'text_pattern_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_guests_phone_pattern', 'guests', ['phone'], postgresql_ops={'phone': 'text_pattern_ops'}, postgresql_concurrently=True)
+    # bills.reservation_id is already covered by bills_reservation_id_key.
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_guests_phone_pattern', table_name='guests', postgresql_concurrently=True)
+        op.drop_index('ix_guests_email_pattern', table_name='guests', postgresql_concurrently=True)
+        op.drop_index('ix_bills_paid_id', table_name='bills', postgresql_concurrently=True)
+        op.drop_index('ix_reservation_room_dates', table_name='reservation', postgresql_concurrently=True)
+        op.drop_index('ix_reservation_check_out_status', table_name='reservation', postgresql_concurrently=True)
+        op.drop_index('ix_reservation_guest_id', table_name='reservation', postgresql_concurrently=True)
+        op.drop_index('ix_rooms_active_room_number', table_name='rooms', postgresql_concurrently=True)
+        op.drop_index('ix_rooms_active_status', table_name='rooms', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""guest search trgm
+
+Revision ID: 41715f0cf3ab
+Revises: 58eae16996cf
+Create Date: 2026-03-04 10:52:44.160337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '41715f0cf3ab'
+down_revision: Union[str, Sequence[str], None] = '58eae16996cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Trigram GIN indexes answer both the word-similarity (<%) and ILIKE 'x%' arms of /guests/search.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_guests_name_trgm', 'guests', ['name'], postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_guests_email_trgm', 'guests', ['email'], postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_guests_phone_trgm', 'guests', ['phone'], postgresql_using='gin', postgresql_ops={'phone': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_guests_phone_trgm', table_name='guests', postgresql_concurrently=True)
+        op.drop_index('ix_guests_email_trgm', table_name='guests', postgresql_concurrently=True)
+        op.drop_index('ix_guests_name_trgm', table_name='guests', postgresql_concurrently=True)
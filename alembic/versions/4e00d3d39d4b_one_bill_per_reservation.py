@@ -0,0 +1,28 @@
+"""one bill per reservation
+
+Revision ID: 4e00d3d39d4b
+Revises: adb697d63c6f
+Create Date: 2026-02-11 09:37:18.644120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e00d3d39d4b'
+down_revision: Union[str, Sequence[str], None] = 'adb697d63c6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_unique_constraint('bills_reservation_id_key', 'bills', ['reservation_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('bills_reservation_id_key', 'bills', type_='unique')
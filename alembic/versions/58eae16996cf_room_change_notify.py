@@ -0,0 +1,51 @@
+"""room change notify
+
+Revision ID: 58eae16996cf
+Revises: b4de052910ed
+Create Date: 2026-03-02 16:27:08.915372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '58eae16996cf'
+down_revision: Union[str, Sequence[str], None] = 'b4de052910ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every worker LISTENs on room_changes and pushes the payload to its /ws/rooms clients,
+    # so changes made by any worker (or straight in the database) reach every socket.
+    op.execute("""
+        CREATE FUNCTION notify_room_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD.status IS NOT DISTINCT FROM NEW.status
+                AND OLD.is_active IS NOT DISTINCT FROM NEW.is_active THEN
+                RETURN NEW;
+            END IF;
+
+            PERFORM pg_notify('room_changes', json_build_object(
+                'id', NEW.id,
+                'room_number', NEW.room_number,
+                'status', NEW.status,
+                'is_active', NEW.is_active)::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER rooms_notify_change AFTER INSERT OR UPDATE OF status, is_active ON rooms "
+        "FOR EACH ROW EXECUTE FUNCTION notify_room_change()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER rooms_notify_change ON rooms")
+    op.execute("DROP FUNCTION notify_room_change()")
@@ -0,0 +1,34 @@
+"""daily occupancy rollup
+
+Revision ID: a3f9867e63a2
+Revises: 39b78f63042d
+Create Date: 2026-02-23 14:05:12.771903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9867e63a2'
+down_revision: Union[str, Sequence[str], None] = '39b78f63042d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_occupancy',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('rooms_sold', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('refreshed_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_occupancy')
@@ -0,0 +1,28 @@
+"""user token version
+
+Revision ID: adb697d63c6f
+Revises: 2d1297b35aea
+Create Date: 2026-02-06 16:02:51.208734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'adb697d63c6f'
+down_revision: Union[str, Sequence[str], None] = '2d1297b35aea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,43 @@
+"""room rates
+
+Revision ID: b4de052910ed
+Revises: 1d0e49adab96
+Create Date: 2026-02-27 11:18:53.604211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4de052910ed'
+down_revision: Union[str, Sequence[str], None] = '1d0e49adab96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('room_rates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('room_type', postgresql.ENUM('SINGLE', 'DOUBLE', name='roomtype', create_type=False), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=True),
+    sa.Column('rate', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.CheckConstraint('start_date < end_date', name='check_rate_start_before_end'),
+    sa.CheckConstraint('weekday BETWEEN 0 AND 6', name='check_rate_weekday'),
+    sa.CheckConstraint('rate > 0', name='check_rate_positive'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_room_rates_type_dates', 'room_rates', ['room_type', 'start_date', 'end_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_room_rates_type_dates', table_name='room_rates')
+    op.drop_table('room_rates')
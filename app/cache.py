@@ -0,0 +1,248 @@
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from .config import settings
+
+logger=logging.getLogger(__name__)
+
+#bounded LRU cache whose entries also expire after ttl seconds
+class TTLCache:
+    def __init__(self, maxsize:int, ttl:float):
+        self.maxsize=maxsize
+        self.ttl=ttl
+        self._data=OrderedDict()
+        self.hits=0
+        self.misses=0
+
+    def get(self, key, default=None):
+        entry=self._data.get(key)
+
+        if entry is None:
+            self.misses+=1
+            return default
+
+        value, expires_at=entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses+=1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits+=1
+        return value
+
+    def set(self, key, value):
+        self._data[key]=(value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+
+#Shared cache backends.
+#get_cache() hands out one namespaced cache per use (principals, room catalog, ...) backed by
+#either process memory or redis, depending on settings.cache_backend. keys are always strings.
+
+INVALIDATION_CHANNEL="pms:cache:invalidate"
+
+_caches={}
+_redis=None
+
+#per-process LRU; nothing to fan out, each worker only ever sees its own writes
+class MemoryCache:
+    def __init__(self, namespace:str, value_type, ttl:float, maxsize:int):
+        self.namespace=namespace
+        self.local=TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation=0
+
+    async def generation(self):
+        return self._generation
+
+    async def get(self, key):
+        return self.local.get(str(key))
+
+    async def set(self, key, value, generation=None):
+        if generation is not None and generation != self._generation:
+            return False
+
+        self.local.set(str(key), value)
+        return True
+
+    async def delete(self, key):
+        self._generation+=1
+        self.local.delete(str(key))
+
+    async def clear(self):
+        self._generation+=1
+        self.local.clear()
+
+    def evict_local(self, key=None):
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.delete(key)
+
+    def stats(self):
+        return {"backend": "memory", **self.local.stats()}
+
+#SET only while the namespace generation still has the value the caller read
+_SET_IF_GENERATION="""
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+#values live in redis as JSON, with a small local LRU in front for hot keys.
+#deletes are published on INVALIDATION_CHANNEL so every worker drops its local copy too.
+#the namespace generation is a redis counter, so a writer on any worker can tell a delete happened meanwhile.
+class RedisCache:
+    def __init__(self, namespace:str, value_type, ttl:float, maxsize:int):
+        from pydantic import TypeAdapter
+
+        self.namespace=namespace
+        self.ttl=ttl
+        self.adapter=TypeAdapter(value_type)
+        self.local=TTLCache(maxsize=maxsize, ttl=ttl)
+        self.remote_hits=0
+        self.remote_misses=0
+
+    def _key(self, key):
+        return f"pms:{self.namespace}:{key}"
+
+    #outside the namespace's key pattern, clear() must not reset it
+    def _generation_key(self):
+        return f"pms:generation:{self.namespace}"
+
+    async def generation(self):
+        return int(await redis_client().get(self._generation_key()) or 0)
+
+    async def get(self, key):
+        key=str(key)
+        value=self.local.get(key)
+        if value is not None:
+            return value
+
+        raw=await redis_client().get(self._key(key))
+        if raw is None:
+            self.remote_misses+=1
+            return None
+
+        self.remote_hits+=1
+        value=self.adapter.validate_json(raw)
+        self.local.set(key, value)
+        return value
+
+    #with a generation (from generation()), stored only if no delete or clear happened since
+    async def set(self, key, value, generation=None):
+        key=str(key)
+        client=redis_client()
+        data=self.adapter.dump_json(value)
+        ttl=max(1, int(self.ttl))
+
+        if generation is None:
+            await client.set(self._key(key), data, ex=ttl)
+        elif not await client.eval(_SET_IF_GENERATION, 2, self._generation_key(), self._key(key), str(generation), data, ttl):
+            return False
+
+        self.local.set(key, value)
+        return True
+
+    async def delete(self, key):
+        key=str(key)
+        self.local.delete(key)
+        client=redis_client()
+        #bumped before the delete, a writer holding the old generation can no longer store its value
+        await client.incr(self._generation_key())
+        await client.delete(self._key(key))
+        await client.publish(INVALIDATION_CHANNEL, json.dumps([self.namespace, key]))
+
+    async def clear(self):
+        self.local.clear()
+        client=redis_client()
+        await client.incr(self._generation_key())
+        keys=[key async for key in client.scan_iter(match=self._key("*"))]
+        if keys:
+            await client.delete(*keys)
+        await client.publish(INVALIDATION_CHANNEL, json.dumps([self.namespace, None]))
+
+    def evict_local(self, key=None):
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.delete(key)
+
+    def stats(self):
+        return {"backend": "redis", **self.local.stats(), "remote_hits": self.remote_hits, "remote_misses": self.remote_misses}
+
+_backends={"memory": MemoryCache, "redis": RedisCache}
+
+def get_cache(namespace:str, value_type, ttl:float, maxsize:int=1024):
+    if namespace not in _caches:
+        _caches[namespace]=_backends[settings.cache_backend](namespace, value_type, ttl, maxsize)
+    return _caches[namespace]
+
+def cache_stats():
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
+
+#any redis-protocol client with the redis.asyncio api, e.g. fakeredis.aioredis.FakeRedis() locally
+def use_redis(client):
+    global _redis
+    _redis=client
+
+def redis_client():
+    global _redis
+    if _redis is None:
+        try:
+            import redis.asyncio
+        except ImportError:
+            raise RuntimeError("cache_backend=redis needs the redis package installed.")
+        _redis=redis.asyncio.Redis.from_url(settings.redis_url)
+    return _redis
+
+#seconds between attempts to resubscribe after the pub/sub connection fails
+RESUBSCRIBE_DELAY=5
+
+#runs for the lifetime of the app, dropping local copies of keys deleted by any worker.
+#a dropped connection is retried; redis errors are not limited to one exception type
+#(and redis is optional), hence the broad except.
+async def listen_for_invalidations():
+    while True:
+        pubsub=redis_client().pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+
+            #invalidations published while not subscribed were missed, start from empty local copies
+            for cache in _caches.values():
+                cache.evict_local()
+
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+
+                namespace, key=json.loads(message["data"])
+                cache=_caches.get(namespace)
+                if cache is not None:
+                    cache.evict_local(key)
+        except Exception:
+            logger.exception("cache invalidation listener lost its connection")
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+        finally:
+            with contextlib.suppress(Exception):
+                await pubsub.aclose()
@@ -0,0 +1,46 @@
+import hashlib
+from pydantic_core import to_json
+from sqlmodel import select
+from . import models,schemas
+from .cache import get_cache
+from .config import settings
+
+#the whole room table, kept in the shared cache until a write invalidates it.
+#the inventory is small and changes a few times a day but is polled constantly.
+class RoomCatalog:
+    def __init__(self):
+        self.cache=get_cache("rooms", schemas.RoomCatalogSnapshot, ttl=settings.room_catalog_ttl, maxsize=1)
+        self._indexed=None
+        self._by_id={}
+
+    async def invalidate(self):
+        await self.cache.delete("all")
+
+    #all rooms ordered by room number, with an ETag derived from their content
+    #so every worker hands out the same tag for the same data
+    async def snapshot(self, db):
+        snapshot=await self.cache.get("all")
+        if snapshot is not None:
+            return snapshot
+
+        generation=await self.cache.generation()
+        rooms=[schemas.RoomResponse.model_validate(room) for room in
+            (await db.exec(select(models.Room).order_by(models.Room.room_number))).all()]
+
+        snapshot=schemas.RoomCatalogSnapshot(etag=f'W/"rooms-{hashlib.sha1(to_json(rooms)).hexdigest()[:16]}"', rooms=rooms)
+
+        #not stored if any worker invalidated while loading, the next reader reloads
+        await self.cache.set("all", snapshot, generation=generation)
+
+        return snapshot
+
+    async def room(self, db, room_id:int):
+        snapshot=await self.snapshot(db)
+
+        if snapshot is not self._indexed:
+            self._by_id={room.id: room for room in snapshot.rooms}
+            self._indexed=snapshot
+
+        return self._by_id.get(room_id)
+
+room_catalog=RoomCatalog()
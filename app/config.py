@@ -1,3 +1,5 @@
+from datetime import time
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,10 +12,74 @@ class Settings(BaseSettings):
     database_password:str
     database_username:str
 
+    #optional read replica (same database name and credentials); GET list/lookup/report routes read from it
+    #while its replay lag stays under replica_max_lag seconds, measured at most every replica_lag_check_interval
+    replica_hostname:Optional[str]=None
+    replica_port:Optional[str]=None
+    replica_max_lag:float=5
+    replica_lag_check_interval:float=1
+
+    #AsyncEngine over psycopg 3 when true, sync engine + threadpool when false
+    async_database:bool=True
+
+    #connection pool
+    database_pool_size:int=5
+    database_max_overflow:int=10
+    database_pool_timeout:float=30
+    database_pool_recycle:int=1800
+    database_pool_pre_ping:bool=True
+    database_echo:bool=False
+
+    #per-route latency/db metrics at /metrics; debug adds a Server-Timing header to every response
+    metrics_enabled:bool=False
+    debug:bool=False
+
+    #log statements slower than this many milliseconds (0 disables)
+    slow_query_ms:float=0
+    #admins may add ?profile=1 to any request for its SQL trace and cProfile summary
+    profiling_enabled:bool=False
+    #log the statement_stats_top normalized statements by total time every statement_stats_interval seconds
+    statement_stats_enabled:bool=False
+    statement_stats_interval:int=300
+    statement_stats_top:int=20
+
+    #rows fetched per server-side cursor roundtrip by the export endpoints
+    export_batch_size:int=2000
+
+    #largest batch accepted by the bulk import endpoints
+    bulk_max_items:int=1000
+
+    #serve /reports from the daily_occupancy rollup, kept fresh as reservations change
+    reports_use_rollup:bool=False
+
+    #daily reservation/room status transitions, run by each worker's scheduler (one wins the advisory lock)
+    scheduler_enabled:bool=True
+    daily_transitions_at:time=time(12, 0)
+    transition_batch_size:int=1000
+
+    #stored responses for Idempotency-Key retries; an unfinished request's key is reclaimable after idempotency_lock_timeout
+    idempotency_ttl:int=86400
+    idempotency_lock_timeout:int=60
+
     #jwt/auth configuration
     secret_key:str
     algorithm:str
     expiration_time:int
+    principal_cache_size:int=10000
+    principal_cache_ttl:int=300
+
+    #"memory" (per worker) or "redis" (shared across workers, invalidated over pub/sub)
+    cache_backend:Literal["memory", "redis"]="memory"
+    redis_url:str="redis://localhost:6379/0"
+    room_catalog_ttl:int=300
+
+    #push room status changes to /ws/rooms, fed by LISTEN on the rooms trigger's channel
+    realtime_enabled:bool=True
+
+    #password hashing
+    bcrypt_rounds:int=12
+    hash_workers:int=4
+    hash_queue_size:int=32
 
     class Config:
         env_file = ".env"
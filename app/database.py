@@ -1,14 +1,248 @@
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
 from typing import Annotated
 from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
 from  .config import settings
 from sqlmodel import create_engine,Session
 
 DATABASE_URL=f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+ASYNC_DATABASE_URL=f"postgresql+psycopg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
 
-engine=create_engine(DATABASE_URL,echo=True)
+if settings.replica_hostname:
+    REPLICA_DATABASE_URL=f"postgresql://{settings.database_username}:{settings.database_password}@{settings.replica_hostname}:{settings.replica_port or settings.database_port}/{settings.database_name}"
+    ASYNC_REPLICA_DATABASE_URL=f"postgresql+psycopg://{settings.database_username}:{settings.database_password}@{settings.replica_hostname}:{settings.replica_port or settings.database_port}/{settings.database_name}"
 
-def get_session():
-    with Session(engine) as session:
+logger=logging.getLogger(__name__)
+
+#callables given the seconds of every checkout wait (request instrumentation)
+pool_wait_listeners=[]
+
+class _TimedPoolMixin:
+    #checkout counters for this pool alone (the primary and the replica each have their own), read by pool_status()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock=threading.Lock()
+        self.stats={"checkouts":0, "timeouts":0, "wait_seconds_total":0.0, "wait_seconds_max":0.0}
+
+    #engine.dispose() swaps in a fresh pool, the counters carry over to it
+    def recreate(self):
+        pool=super().recreate()
+        pool._stats_lock=self._stats_lock
+        pool.stats=self.stats
+        return pool
+
+    #time spent waiting for a connection (including opening a new one on overflow)
+    def _do_get(self):
+        start=time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.stats["timeouts"]+=1
+            raise
+        finally:
+            waited=time.perf_counter() - start
+            with self._stats_lock:
+                self.stats["checkouts"]+=1
+                self.stats["wait_seconds_total"]+=waited
+                self.stats["wait_seconds_max"]=max(self.stats["wait_seconds_max"], waited)
+            for listener in pool_wait_listeners:
+                listener(waited)
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+#sync Session exposed through the AsyncSession api, every call is one threadpool hop.
+#lets the async handlers run unchanged on the old engine for A/B comparisons.
+def _threaded(name):
+    async def method(self, *args, **kwargs):
+        return await run_in_threadpool(getattr(self.sync_session, name), *args, **kwargs)
+    return method
+
+class ThreadedSession:
+    def __init__(self, session:Session):
+        self.sync_session=session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    get=_threaded("get")
+    exec=_threaded("exec")
+    execute=_threaded("execute")
+    scalar=_threaded("scalar")
+    scalars=_threaded("scalars")
+    delete=_threaded("delete")
+    flush=_threaded("flush")
+    refresh=_threaded("refresh")
+    commit=_threaded("commit")
+    rollback=_threaded("rollback")
+    close=_threaded("close")
+
+pool_options=dict(
+    echo=settings.database_echo,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_timeout=settings.database_pool_timeout,
+    pool_recycle=settings.database_pool_recycle,
+    pool_pre_ping=settings.database_pool_pre_ping)
+
+replica_engine=None
+
+if settings.async_database:
+    engine=create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool, **pool_options)
+    async_session=async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    if settings.replica_hostname:
+        replica_engine=create_async_engine(ASYNC_REPLICA_DATABASE_URL, poolclass=TimedAsyncQueuePool, **pool_options)
+        async_replica_session=async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+else:
+    engine=create_engine(DATABASE_URL, poolclass=TimedQueuePool, **pool_options)
+
+    if settings.replica_hostname:
+        replica_engine=create_engine(REPLICA_DATABASE_URL, poolclass=TimedQueuePool, **pool_options)
+
+def _pool_report(engine):
+    pool=getattr(engine, "sync_engine", engine).pool
+
+    with pool._stats_lock:
+        stats=dict(pool.stats)
+
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.database_max_overflow,
+        "checkouts": stats["checkouts"],
+        "timeouts": stats["timeouts"],
+        "wait_seconds_avg": stats["wait_seconds_total"] / stats["checkouts"] if stats["checkouts"] else 0.0,
+        "wait_seconds_max": stats["wait_seconds_max"],
+    }
+
+def pool_status():
+    replica=None
+    if replica_engine is not None:
+        replica={**_pool_report(replica_engine), **_replica_state}
+
+    return {
+        "primary": _pool_report(engine),
+        "replica": replica,
+    }
+
+#postgres error details of a failed statement (psycopg diagnostics)
+def sqlstate(error:exc.DBAPIError):
+    return getattr(error.orig, "sqlstate", None)
+
+def violated_constraint(error:exc.DBAPIError):
+    return getattr(getattr(error.orig, "diag", None), "constraint_name", None)
+
+def error_message(error:exc.DBAPIError):
+    return getattr(getattr(error.orig, "diag", None), "message_primary", None) or str(error.orig).splitlines()[0]
+
+#one session for a unit of work outside of a request (background jobs, streaming responses)
+@asynccontextmanager
+async def session_scope(replica:bool=False):
+    if settings.async_database:
+        async with (async_replica_session if replica else async_session)() as session:
+            yield session
+    else:
+        session=ThreadedSession(Session(replica_engine if replica else engine, expire_on_commit=False))
+        try:
+            yield session
+        finally:
+            await session.close()
+
+#seconds the replica is behind, or null when it cannot be trusted.
+#a standby whose wal receiver disconnected or stalled has replayed everything it received and would
+#look caught up forever, so it only counts as current while the receiver is streaming.
+#pg_stat_wal_receiver.status is only visible to roles with pg_read_all_stats (e.g. via pg_monitor);
+#without it the replica reads as unusable and traffic stays on the primary.
+#a plain instance outside recovery reports 0, so two local servers work for testing.
+REPLICA_LAG_SQL=text("""
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+""")
+
+_replica_state={"usable": False, "lag_seconds": None, "checked_at": None}
+_replica_checked=0.0
+
+#whether reads may go to the replica, re-measured at most once per replica_lag_check_interval
+async def replica_usable():
+    global _replica_checked
+
+    if replica_engine is None:
+        return False
+
+    now=time.monotonic()
+    if now - _replica_checked < settings.replica_lag_check_interval:
+        return _replica_state["usable"]
+
+    #claimed before awaiting, concurrent callers keep using the previous answer meanwhile
+    _replica_checked=now
+    try:
+        async with session_scope(replica=True) as session:
+            lag=await session.scalar(REPLICA_LAG_SQL)
+        lag=float(lag) if lag is not None else None
+    except (exc.DBAPIError, OSError):
+        logger.warning("replica lag check failed, reading from the primary", exc_info=True)
+        lag=None
+
+    _replica_state.update(
+        usable=lag is not None and lag <= settings.replica_max_lag,
+        lag_seconds=lag,
+        checked_at=time.time())
+
+    return _replica_state["usable"]
+
+#session on the replica while it keeps up, on the primary otherwise.
+#only for reads that tolerate replica_max_lag of staleness.
+@asynccontextmanager
+async def read_session_scope():
+    async with session_scope(replica=await replica_usable()) as session:
+        yield session
+
+#server-side cursor over statement, yielding lists of row mappings yield_per rows at a time.
+#opens its own session so it can outlive the request dependency (StreamingResponse bodies).
+async def stream_partitions(statement, yield_per:int, read_only:bool=False):
+    statement=statement.execution_options(yield_per=yield_per)
+
+    async with (read_session_scope() if read_only else session_scope()) as session:
+        if settings.async_database:
+            result=await session.stream(statement)
+            async for partition in result.mappings().partitions():
+                yield partition
+        else:
+            result=await session.execute(statement)
+            partitions=result.mappings().partitions()
+            while (partition := await run_in_threadpool(next, partitions, None)) is not None:
+                yield partition
+
+async def get_session():
+    async with session_scope() as session:
+        yield session
+
+SessionLocal= Annotated[AsyncSession,Depends(get_session)]
+
+#for GET handlers that never write and need not read their own writes
+async def get_read_session():
+    async with read_session_scope() as session:
         yield session
 
-SessionLocal= Annotated[Session,Depends(get_session)]
\ No newline at end of file
+ReadSessionLocal= Annotated[AsyncSession,Depends(get_read_session)]
\ No newline at end of file
@@ -0,0 +1,48 @@
+import csv
+import io
+from decimal import Decimal
+from enum import StrEnum
+import orjson
+from fastapi.responses import StreamingResponse
+from . import database
+from .config import settings
+
+class ExportFormat(StrEnum):
+    NDJSON="ndjson"
+    CSV="csv"
+
+#orjson writes date/datetime itself
+def _encode(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot export value of type {type(value).__name__}")
+
+async def _ndjson(partitions):
+    async for rows in partitions:
+        yield b"".join(orjson.dumps(dict(row), default=_encode, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+async def _csv(partitions, columns):
+    buffer=io.StringIO()
+    writer=csv.writer(buffer)
+
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([row[column] for column in columns] for row in rows)
+        yield buffer.getvalue()
+
+#streams the rows of a column select with constant memory, one cursor batch per chunk
+def export_response(statement, export_format:ExportFormat, filename:str):
+    columns=[column.key for column in statement.selected_columns]
+    partitions=database.stream_partitions(statement, settings.export_batch_size, read_only=True)
+
+    if export_format == ExportFormat.CSV:
+        body, media_type=_csv(partitions, columns), "text/csv"
+    else:
+        body, media_type=_ndjson(partitions), "application/x-ndjson"
+
+    return StreamingResponse(body, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'})
@@ -0,0 +1,173 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import delete, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from . import database, models, oauth2
+from .config import settings
+
+IDEMPOTENCY_HEADER=b"idempotency-key"
+REPLAYED_HEADER="Idempotent-Replayed"
+MAX_KEY_LENGTH=255
+
+#POST routes whose responses are stored under an Idempotency-Key
+IDEMPOTENT_PATHS={"/guests/", "/guests/bulk", "/reservations/", "/reservations/bulk"}
+
+def _request_hash(scope, body:bytes):
+    return hashlib.sha256(scope["path"].encode() + b"\0" + body).hexdigest()
+
+#claim (user_id, key) for this request: a new key, an expired one, or one whose request died mid-flight.
+#returns True when the caller should run the request.
+async def _claim(user_id:int, key:str, request_hash:str):
+    now=datetime.now(timezone.utc)
+
+    statement=insert(models.IdempotencyKey).values(
+        user_id=user_id, key=key, request_hash=request_hash, created_at=now,
+        expires_at=now + timedelta(seconds=settings.idempotency_ttl))
+
+    statement=statement.on_conflict_do_update(
+        index_elements=["user_id", "key"],
+        set_={
+            "request_hash": statement.excluded.request_hash,
+            "status_code": None,
+            "content_type": None,
+            "response_body": None,
+            "created_at": statement.excluded.created_at,
+            "expires_at": statement.excluded.expires_at,
+        },
+        where=or_(
+            models.IdempotencyKey.expires_at < now,
+            (models.IdempotencyKey.status_code.is_(None)) &
+            (models.IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_lock_timeout))))
+
+    async with database.session_scope() as db:
+        claimed=(await db.scalars(statement.returning(models.IdempotencyKey.key))).first()
+        await db.commit()
+
+        if claimed is not None:
+            return True, None
+
+        return False, await db.get(models.IdempotencyKey, (user_id, key))
+
+async def _store(user_id:int, key:str, status_code:int, content_type, body:bytes):
+    async with database.session_scope() as db:
+        record=await db.get(models.IdempotencyKey, (user_id, key))
+        if record is not None:
+            record.status_code=status_code
+            record.content_type=content_type
+            record.response_body=body
+            await db.commit()
+
+#failed requests are not stored, the client may retry them with the same key
+async def _release(user_id:int, key:str):
+    async with database.session_scope() as db:
+        await db.exec(delete(models.IdempotencyKey).where(
+            models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key))
+        await db.commit()
+
+#delete expired keys batch_size at a time, run by the scheduler
+async def purge_expired(batch_size:int):
+    purged=0
+    while True:
+        expired=(
+            select(models.IdempotencyKey.user_id, models.IdempotencyKey.key)
+            .where(models.IdempotencyKey.expires_at < datetime.now(timezone.utc))
+            .limit(batch_size))
+
+        async with database.session_scope() as db:
+            result=await db.exec(delete(models.IdempotencyKey).where(
+                tuple_(models.IdempotencyKey.user_id, models.IdempotencyKey.key).in_(expired)))
+            await db.commit()
+
+        purged+=result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+
+def _error(status_code:int, detail:str, headers=None):
+    return JSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+
+#replays the stored 2xx response of a POST retried with the same Idempotency-Key, scoped per user.
+#requests without the header, or to other routes, pass straight through.
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app=app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in IDEMPOTENT_PATHS:
+            return await self.app(scope, receive, send)
+
+        headers=dict(scope["headers"])
+        key=headers.get(IDEMPOTENCY_HEADER, b"").decode("latin-1").strip()
+        if not key:
+            return await self.app(scope, receive, send)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return await _error(status.HTTP_400_BAD_REQUEST, f"Idempotency-Key is limited to {MAX_KEY_LENGTH} characters.")(scope, receive, send)
+
+        #unauthenticated requests run normally and get the route's own 401
+        try:
+            principal=await oauth2.principal_from_authorization(headers.get(b"authorization", b"").decode("latin-1"))
+        except HTTPException:
+            return await self.app(scope, receive, send)
+
+        body=await _read_body(receive)
+        request_hash=_request_hash(scope, body)
+
+        claimed, record=await _claim(principal.id, key, request_hash)
+
+        if not claimed:
+            if record is None or record.request_hash != request_hash:
+                return await _error(status.HTTP_422_UNPROCESSABLE_ENTITY, "Idempotency-Key was already used for a different request.")(scope, receive, send)
+
+            if record.status_code is None:
+                return await _error(status.HTTP_409_CONFLICT, "A request with this Idempotency-Key is still in progress.",
+                    headers={"Retry-After": "1"})(scope, receive, send)
+
+            replay=Response(record.response_body, status_code=record.status_code, media_type=record.content_type,
+                headers={REPLAYED_HEADER: "true"})
+            return await replay(scope, receive, send)
+
+        response_start={}
+        chunks=[]
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response_start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_body(body), capture)
+        except BaseException:
+            await _release(principal.id, key)
+            raise
+
+        status_code=response_start.get("status", 500)
+        if 200 <= status_code < 300:
+            content_type=dict(response_start.get("headers", [])).get(b"content-type", b"application/json").decode("latin-1")
+            await _store(principal.id, key, status_code, content_type, b"".join(chunks))
+        else:
+            await _release(principal.id, key)
+
+async def _read_body(receive):
+    body=b""
+    while True:
+        message=await receive()
+        body+=message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+#receive callable handing the already-read body to the app
+def _replay_body(body:bytes):
+    sent=False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent=True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    return receive
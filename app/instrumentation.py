@@ -0,0 +1,334 @@
+import asyncio
+import bisect
+import cProfile
+import io
+import logging
+import pstats
+import re
+import time
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from . import database, oauth2, rbac
+from .config import settings
+
+logger=logging.getLogger(__name__)
+
+#seconds
+LATENCY_BUCKETS=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#db work done on behalf of the current request
+class RequestTimings:
+    __slots__=("scope", "statements", "db_seconds", "pool_wait_seconds", "trace")
+
+    def __init__(self, scope, trace:bool=False):
+        self.scope=scope
+        self.statements=0
+        self.db_seconds=0.0
+        self.pool_wait_seconds=0.0
+        #every statement of the request, kept only in ?profile=1 mode
+        self.trace=[] if trace else None
+
+    @property
+    def route(self):
+        return getattr(self.scope.get("route"), "path", self.scope.get("path"))
+
+    def server_timing(self, total_seconds:float):
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} statements", '
+            f"pool;dur={self.pool_wait_seconds * 1000:.1f}, "
+            f"total;dur={total_seconds * 1000:.1f}")
+
+_current_timings=ContextVar("request_timings", default=None)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets=buckets
+        self.counts=[0] * (len(buckets) + 1)
+        self.sum=0.0
+        self.count=0
+
+    def observe(self, value:float):
+        self.counts[bisect.bisect_left(self.buckets, value)]+=1
+        self.sum+=value
+        self.count+=1
+
+class RouteStats:
+    def __init__(self):
+        self.latency=Histogram()
+        self.statements=0
+        self.db_seconds=0.0
+        self.pool_wait_seconds=0.0
+
+#(method, route template, status code) -> RouteStats
+_routes={}
+
+def _record(method:str, route:str, status_code:int, seconds:float, timings:RequestTimings):
+    key=(method, route, status_code)
+    stats=_routes.get(key)
+    if stats is None:
+        stats=_routes[key]=RouteStats()
+
+    stats.latency.observe(seconds)
+    stats.statements+=timings.statements
+    stats.db_seconds+=timings.db_seconds
+    stats.pool_wait_seconds+=timings.pool_wait_seconds
+
+
+#Statement normalization and aggregation
+
+_IN_LIST=re.compile(r"%\(\w+\)s(\s*,\s*%\(\w+\)s)+")
+_PARAMETER=re.compile(r"%\(\w+\)s|%s|\$\d+")
+_LITERAL=re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE=re.compile(r"\s+")
+
+#one shape per query regardless of bind names, IN list length or inlined literals
+def normalize_statement(statement:str):
+    statement=_IN_LIST.sub("?, ...", statement)
+    statement=_PARAMETER.sub("?", statement)
+    statement=_LITERAL.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+#parameter names and types, never values
+def parameters_shape(parameters, executemany:bool):
+    if executemany:
+        return {"rows": len(parameters), "row": parameters_shape(parameters[0], False) if parameters else {}}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+#normalized statement -> [calls, total seconds, max seconds], since the last report
+_statement_stats={}
+#distinct statements tracked per interval, further shapes are dropped until the next report
+MAX_TRACKED_STATEMENTS=1000
+
+def _aggregate(statement:str, seconds:float):
+    key=normalize_statement(statement)
+    stats=_statement_stats.get(key)
+
+    if stats is None:
+        if len(_statement_stats) >= MAX_TRACKED_STATEMENTS:
+            return
+        stats=_statement_stats[key]=[0, 0.0, 0.0]
+
+    stats[0]+=1
+    stats[1]+=seconds
+    stats[2]=max(stats[2], seconds)
+
+def top_statements(limit:int):
+    ranked=sorted(_statement_stats.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return [
+        {"statement": statement, "calls": calls, "total_ms": round(total * 1000, 3), "max_ms": round(longest * 1000, 3)}
+        for statement, (calls, total, longest) in ranked
+    ]
+
+#log the top statements by total time every interval and start a new window
+async def report_statement_stats():
+    while True:
+        await asyncio.sleep(settings.statement_stats_interval)
+
+        top=top_statements(settings.statement_stats_top)
+        _statement_stats.clear()
+
+        for entry in top:
+            logger.info("top statement calls=%d total_ms=%.1f max_ms=%.1f: %s",
+                entry["calls"], entry["total_ms"], entry["max_ms"], entry["statement"])
+
+
+#SQLAlchemy/pool hooks, installed once and only when instrumentation is on
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not conn.info.get("query_start"):
+        return
+
+    seconds=time.perf_counter() - conn.info["query_start"].pop()
+    timings=_current_timings.get()
+
+    if timings is not None:
+        timings.statements+=1
+        timings.db_seconds+=seconds
+
+        if timings.trace is not None:
+            timings.trace.append({
+                "statement": statement,
+                "parameters": parameters_shape(parameters, executemany),
+                "duration_ms": round(seconds * 1000, 3)})
+
+    if settings.slow_query_ms and seconds * 1000 >= settings.slow_query_ms:
+        logger.warning("slow query %.1fms route=%s parameters=%s: %s",
+            seconds * 1000,
+            timings.route if timings is not None else None,
+            parameters_shape(parameters, executemany),
+            _WHITESPACE.sub(" ", statement))
+
+    if settings.statement_stats_enabled:
+        _aggregate(statement, seconds)
+
+def _on_pool_wait(seconds:float):
+    timings=_current_timings.get()
+    if timings is not None:
+        timings.pool_wait_seconds+=seconds
+
+_installed=False
+
+def install():
+    global _installed
+    if _installed:
+        return
+
+    for engine in (database.engine, database.replica_engine):
+        if engine is None:
+            continue
+        sync_engine=getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    database.pool_wait_listeners.append(_on_pool_wait)
+    _installed=True
+
+
+#pure ASGI so that requests pay for two perf_counter calls and a contextvar, nothing more
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app=app
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if settings.profiling_enabled and _profile_requested(scope):
+            return await self._profile(scope, receive, send)
+
+        timings=RequestTimings(scope)
+        token=_current_timings.set(timings)
+        start=time.perf_counter()
+        status_code=500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code=message["status"]
+                if settings.debug:
+                    MutableHeaders(scope=message).append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            if settings.metrics_enabled:
+                #the route template rather than the raw path keeps label cardinality bounded
+                route=scope.get("route")
+                _record(scope["method"], getattr(route, "path", "unmatched"), status_code, time.perf_counter() - start, timings)
+
+    #run the request under cProfile and answer with its SQL trace and profile instead of its body
+    async def _profile(self, scope, receive, send):
+        try:
+            await _require_admin(scope)
+        except HTTPException as error:
+            response=JSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)
+            return await response(scope, receive, send)
+
+        timings=RequestTimings(scope, trace=True)
+        token=_current_timings.set(timings)
+        status_code=500
+
+        async def capture(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code=message["status"]
+
+        #cProfile sees the whole thread, so requests served concurrently show up in the profile too
+        profiler=cProfile.Profile()
+        start=time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.disable()
+            _current_timings.reset(token)
+
+        output=io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+
+        response=JSONResponse({
+            "route": timings.route,
+            "status_code": status_code,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "db_ms": round(timings.db_seconds * 1000, 3),
+            "statements": timings.trace,
+            "profile": output.getvalue(),
+        })
+        await response(scope, receive, send)
+
+PROFILE_TOP_FUNCTIONS=40
+
+def _profile_requested(scope):
+    return parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile") == ["1"]
+
+#the same checks as Depends(rbac.require_roles(["admin"])), resolved by hand outside of routing
+async def _require_admin(scope):
+    authorization=dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    principal=await oauth2.principal_from_authorization(authorization)
+
+    await rbac.require_roles(["admin"])(principal)
+
+
+#Prometheus text exposition format
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+def render_metrics():
+    lines=[
+        "# HELP pms_http_request_duration_seconds Request latency by route.",
+        "# TYPE pms_http_request_duration_seconds histogram",
+    ]
+    routes=sorted(_routes.items())
+
+    for (method, route, status_code), stats in routes:
+        labels=dict(method=method, route=route, status=status_code)
+        cumulative=0
+        for bucket, count in zip(stats.latency.buckets, stats.latency.counts):
+            cumulative+=count
+            lines.append(f"pms_http_request_duration_seconds_bucket{_labels(**labels, le=bucket)} {cumulative}")
+        lines.append(f"pms_http_request_duration_seconds_bucket{_labels(**labels, le='+Inf')} {stats.latency.count}")
+        lines.append(f"pms_http_request_duration_seconds_sum{_labels(**labels)} {stats.latency.sum}")
+        lines.append(f"pms_http_request_duration_seconds_count{_labels(**labels)} {stats.latency.count}")
+
+    counters=[
+        ("pms_http_db_statements_total", "SQL statements executed by route.", "statements"),
+        ("pms_http_db_seconds_total", "Time spent executing SQL by route.", "db_seconds"),
+        ("pms_http_pool_wait_seconds_total", "Time spent waiting for a pooled connection by route.", "pool_wait_seconds"),
+    ]
+    for name, description, attribute in counters:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for (method, route, status_code), stats in routes:
+            lines.append(f"{name}{_labels(method=method, route=route, status=status_code)} {getattr(stats, attribute)}")
+
+    pools=[(name, status) for name, status in database.pool_status().items() if status is not None]
+    gauges=[
+        ("pms_db_pool_size", "Configured pool size.", "size"),
+        ("pms_db_pool_checked_out", "Connections currently checked out.", "checked_out"),
+        ("pms_db_pool_overflow", "Connections open beyond the pool size.", "overflow"),
+    ]
+    for name, description, key in gauges:
+        lines.extend([f"# HELP {name} {description}", f"# TYPE {name} gauge"])
+        for pool_name, status in pools:
+            lines.append(f"{name}{_labels(pool=pool_name)} {status[key]}")
+
+    lines.extend([
+        "# HELP pms_db_pool_timeouts_total Checkouts that gave up after the pool timeout.",
+        "# TYPE pms_db_pool_timeouts_total counter",
+    ])
+    for pool_name, status in pools:
+        lines.append(f"pms_db_pool_timeouts_total{_labels(pool=pool_name)} {status['timeouts']}")
+
+    return "\n".join(lines) + "\n"
@@ -1,14 +1,60 @@
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .routes import users,auth,rooms,reservations,guest
+from . import cache,scheduler,instrumentation,idempotency,realtime
+from .responses import ORJSONResponse
+from .config import settings
+from .routes import users,auth,rooms,reservations,guest,bills,reports,internal,metrics,ws
 
-app=FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks=[]
+
+    #evict local copies of keys other workers changed
+    if settings.cache_backend == "redis":
+        tasks.append(asyncio.create_task(cache.listen_for_invalidations()))
+
+    #room status changes from every worker, pushed to this worker's websockets
+    if settings.realtime_enabled:
+        tasks.append(asyncio.create_task(realtime.listen_for_room_changes()))
+
+    #daily check-in/check-out/no-show transitions
+    if settings.scheduler_enabled:
+        tasks.append(asyncio.create_task(scheduler.run_scheduler()))
+
+    if settings.statement_stats_enabled:
+        tasks.append(asyncio.create_task(instrumentation.report_statement_stats()))
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+app=FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+#retried POSTs carrying an Idempotency-Key get the stored response instead of a second insert
+app.add_middleware(idempotency.IdempotencyMiddleware)
+
+#nothing is hooked into requests or the engine unless one of the instrumentation settings is on
+if settings.metrics_enabled or settings.debug or settings.slow_query_ms or settings.profiling_enabled or settings.statement_stats_enabled:
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
 
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(rooms.router)
 app.include_router(guest.router)
 app.include_router(reservations.router)
+app.include_router(bills.router)
+app.include_router(reports.router)
+app.include_router(internal.router)
+app.include_router(ws.router)
+
+if settings.metrics_enabled:
+    app.include_router(metrics.router)
 
 @app.get("/")
-def index():
+async def index():
     return {"Happy":"Moments"}
\ No newline at end of file
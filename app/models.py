@@ -4,7 +4,7 @@ from typing import List, Optional
 from pydantic import EmailStr
 from sqlmodel import Column, Field, ForeignKey,Integer, Relationship, SQLModel,Numeric, TIMESTAMP
 from enum import StrEnum
-from sqlalchemy import CheckConstraint, Enum as SAEnum
+from sqlalchemy import CheckConstraint, Enum as SAEnum, Index, LargeBinary, text
 
 #Enum classes
 class Roles(StrEnum):
@@ -42,7 +42,30 @@ class Room(SQLModel, table=True):
     reservations: List["Reservation"] = Relationship(back_populates="room")
 
     __table_args__=(CheckConstraint("capacity > 0",  name="check_capacity_more_than_zero"),
-                    CheckConstraint("price > 0", name="check_price_more_than_zero"))
+                    CheckConstraint("price > 0", name="check_price_more_than_zero"),
+                    Index("ix_rooms_active_status", "status", postgresql_where=text("is_active")),
+                    Index("ix_rooms_active_room_number", "room_number", postgresql_where=text("is_active")))
+
+#Table : room_rates
+#nightly rate calendar per room type. a night takes the highest priority rate covering it,
+#weekday-specific rates beating every-day ones; nights no rate covers fall back to rooms.price.
+class RoomRate(SQLModel, table=True):
+    __tablename__="room_rates"
+
+    id: int | None = Field(default=None, primary_key=True)
+    room_type: RoomType
+    #[start_date, end_date)
+    start_date: date
+    end_date: date
+    #0 = monday .. 6 = sunday, null for every day
+    weekday: Optional[int] = None
+    rate: Decimal=Field(sa_column=Column(Numeric(10,2), nullable=False))
+    priority: int = Field(default=0)
+
+    __table_args__=(CheckConstraint("start_date < end_date", name="check_rate_start_before_end"),
+                    CheckConstraint("weekday BETWEEN 0 AND 6", name="check_rate_weekday"),
+                    CheckConstraint("rate > 0", name="check_rate_positive"),
+                    Index("ix_room_rates_type_dates", "room_type", "start_date", "end_date"))
 
 #Table : reservation
 
@@ -63,6 +86,9 @@ class Reservation(SQLModel, table=True):
     check_out: date
     no_of_guests:int
     per_night_rate: Decimal=Field(sa_column=Column(Numeric(10,2)))
+    #exact price of the stay from the rate calendar; per_night_rate is its rounded average.
+    #null for stays booked before the calendar existed, which bill nights * per_night_rate.
+    quoted_total: Optional[Decimal]=Field(default=None, sa_column=Column(Numeric(10,2), nullable=True))
 
     created_at: datetime = Field(default_factory=lambda:datetime.now(timezone.utc), sa_column=Column(TIMESTAMP(timezone=True),nullable=False))
 
@@ -75,7 +101,10 @@ class Reservation(SQLModel, table=True):
     
     __table_args__= (CheckConstraint("check_in < check_out", name="check_check_in_before_check_out"),
                     CheckConstraint("per_night_rate > 0",name="check_per_night_rate_positive"),
-                    CheckConstraint("no_of_guests > 0", name="check_guest_count_positive")
+                    CheckConstraint("no_of_guests > 0", name="check_guest_count_positive"),
+                    Index("ix_reservation_guest_id", "guest_id"),
+                    Index("ix_reservation_check_out_status", "check_out", "status"),
+                    Index("ix_reservation_room_check_in", "room_id", "check_in", "check_out")
                                    )
 
 #Table : Bills
@@ -84,8 +113,9 @@ class Bill(SQLModel, table=True):
 
     id: int | None=Field(default=None, primary_key=True)
 
+    #one bill per reservation, lets the batch run skip already billed stays
     reservation_id: int = Field(
-        sa_column=Column(Integer, ForeignKey("reservation.id", ondelete="CASCADE")))
+        sa_column=Column(Integer, ForeignKey("reservation.id", ondelete="CASCADE"), unique=True))
     
     total_amount:Decimal=Field(sa_column=Column(Numeric(10,2)))
     paid : bool = Field(default=False)
@@ -93,6 +123,8 @@ class Bill(SQLModel, table=True):
 
     reservation: "Reservation" = Relationship(back_populates="bill")
 
+    __table_args__=(Index("ix_bills_paid_id", "paid", "id"),)
+
 
 #Table : Users
 class User(SQLModel, table=True):
@@ -102,6 +134,8 @@ class User(SQLModel, table=True):
     username: str = Field(unique=True)
     hashed_password:str
     role: Roles
+    #bumped to revoke every token issued to the user
+    token_version: int = Field(default=0)
 
 class Guest(SQLModel, table=True):
 
@@ -110,4 +144,37 @@ class Guest(SQLModel, table=True):
     name: str
     phone:str
     email: str = Field(unique=True)
-    reservations: List["Reservation"]=Relationship(back_populates="guest")
\ No newline at end of file
+    reservations: List["Reservation"]=Relationship(back_populates="guest")
+
+    #text_pattern_ops so the email/phone prefix filters (LIKE 'x%') can use a btree,
+    #trigram GIN indexes for /guests/search
+    __table_args__=(Index("ix_guests_email_pattern", "email", postgresql_ops={"email": "text_pattern_ops"}),
+                    Index("ix_guests_phone_pattern", "phone", postgresql_ops={"phone": "text_pattern_ops"}),
+                    Index("ix_guests_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+                    Index("ix_guests_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+                    Index("ix_guests_phone_trgm", "phone", postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"}))
+
+#Table : daily_occupancy
+#materialized per-day rollup behind /reports, refreshed for the dates a reservation touches
+class DailyOccupancy(SQLModel, table=True):
+    __tablename__="daily_occupancy"
+
+    day: date = Field(primary_key=True)
+    rooms_sold: int
+    revenue: Decimal=Field(sa_column=Column(Numeric(12,2), nullable=False))
+    refreshed_at: datetime = Field(default_factory=lambda:datetime.now(timezone.utc), sa_column=Column(TIMESTAMP(timezone=True), nullable=False))
+
+#Table : idempotency_keys
+#first response to a POST carrying an Idempotency-Key, replayed to retries of the same request.
+#status_code is null while the original request is still running.
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__="idempotency_keys"
+
+    user_id: int = Field(sa_column=Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True))
+    key: str = Field(primary_key=True, max_length=255)
+    request_hash: str = Field(max_length=64)
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    response_body: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+    created_at: datetime = Field(default_factory=lambda:datetime.now(timezone.utc), sa_column=Column(TIMESTAMP(timezone=True), nullable=False))
+    expires_at: datetime = Field(sa_column=Column(TIMESTAMP(timezone=True), nullable=False, index=True))
@@ -1,10 +1,12 @@
 from fastapi import Depends, HTTPException,status
 from jose import JWTError, jwt
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import settings
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from datetime import datetime,timedelta, timezone
-from . import models,database
+from . import models,database,schemas
+from .cache import get_cache
 
 oauth2_scheme=OAuth2PasswordBearer(tokenUrl="/login")
 
@@ -12,6 +14,9 @@ SECRET_KEY=settings.secret_key
 ALGORITHM=settings.algorithm
 EXPIRATION_TIME=settings.expiration_time
 
+#principals by user id, so a valid token normally needs no database roundtrip
+principal_cache=get_cache("principals", schemas.Principal, ttl=settings.principal_cache_ttl, maxsize=settings.principal_cache_size)
+
 def get_token(data:dict):
     to_encode=data.copy()
 
@@ -22,6 +27,9 @@ def get_token(data:dict):
     encoded_jwt =jwt.encode(to_encode,SECRET_KEY,algorithm=ALGORITHM)
     return encoded_jwt
 
+def get_user_token(user:models.User):
+    return get_token({"user_id":user.id, "role":user.role, "ver":user.token_version})
+
 def verify_token(token:str, credentials_exception):
     try:
         data=jwt.decode(token,SECRET_KEY, algorithms=[ALGORITHM])
@@ -31,20 +39,49 @@ def verify_token(token:str, credentials_exception):
         if not user_id:
             raise credentials_exception
         
-        return user_id
+        return schemas.TokenData(id=user_id, role=data.get("role"), version=data.get("ver"))
         
     except JWTError:
         raise credentials_exception
-    
 
-def get_current_user(db:Session =Depends(database.get_session),token=Depends(oauth2_scheme)):
+#tokens carry the version they were issued with; bumping it revokes every outstanding one.
+#call before committing a role or password change, then invalidate_principal() after the commit.
+def revoke_tokens(user:models.User):
+    user.token_version+=1
+
+async def invalidate_principal(user_id:int):
+    await principal_cache.delete(user_id)
+
+async def get_current_user(db:AsyncSession =Depends(database.get_session),token=Depends(oauth2_scheme)):
     credentials_exception= HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Couldnot validate credentials",headers={"WWW-Authenticate":"Bearer"})
 
-    user_id=verify_token(token, credentials_exception)
+    token_data=verify_token(token, credentials_exception)
+
+    principal=await principal_cache.get(token_data.id)
 
-    user=db.get(models.User, user_id)
+    if principal is None:
+        #a revocation committed while loading must not be overwritten by the old principal
+        generation=await principal_cache.generation()
+        user=await db.get(models.User, token_data.id)
 
-    if not user:
+        if not user:
+            raise credentials_exception
+
+        principal=schemas.Principal.model_validate(user)
+        await principal_cache.set(principal.id, principal, generation=generation)
+
+    #tokens issued before a role change or revocation no longer match the principal
+    if principal.token_version != token_data.version or principal.role != token_data.role:
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    return principal
+
+#the principal behind an Authorization header, for middleware that runs outside of dependency injection
+async def principal_from_authorization(authorization:str):
+    scheme, token=get_authorization_scheme_param(authorization)
+
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated", headers={"WWW-Authenticate":"Bearer"})
+
+    async with database.session_scope() as db:
+        return await get_current_user(db=db, token=token)
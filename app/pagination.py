@@ -0,0 +1,52 @@
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException, Query, Response, status
+
+NEXT_CURSOR_HEADER="X-Next-Cursor"
+
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+#every pagination key is an integer column, anything else was not issued by encode_cursor
+def decode_cursor(cursor:str):
+    try:
+        value=json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        value=None
+
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+    return value
+
+#limit/after query parameters shared by every list endpoint
+class Page:
+    def __init__(self, limit: int=Query(100, ge=1, le=1000), after: Optional[str]=None):
+        self.limit=limit
+        self.after=decode_cursor(after) if after else None
+
+#keyset pagination on a unique, indexed column. fetches one extra row to know
+#whether another page exists and hands its cursor back in the X-Next-Cursor header.
+async def paginate(db, query, key, page:Page, response:Response):
+    if page.after is not None:
+        query=query.where(key > page.after)
+
+    rows=(await db.exec(query.order_by(key).limit(page.limit + 1))).all()
+
+    if len(rows) > page.limit:
+        rows=rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER]=encode_cursor(getattr(rows[-1], key.key))
+
+    return rows
+
+#same contract as paginate() for a list already sorted by the attribute named key
+def paginate_sorted(items, key:str, page:Page, response:Response):
+    if page.after is not None:
+        items=[item for item in items if getattr(item, key) > page.after]
+
+    if len(items) > page.limit:
+        items=items[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER]=encode_cursor(getattr(items[-1], key))
+
+    return items
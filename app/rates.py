@@ -0,0 +1,124 @@
+import hashlib
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from pydantic_core import to_json
+from sqlalchemy import Date, extract, func, or_, select, true
+from . import models, schemas
+from .cache import get_cache
+from .config import settings
+
+CENTS=Decimal("0.01")
+
+#later in this order wins, mirroring the ORDER BY of nightly_rates()
+def _precedence(rate):
+    return (rate.priority, rate.weekday is not None, rate.id)
+
+#every night of the calendar laid out per room type as prefix sums, so pricing a stay is
+#two lookups per room instead of a loop over its nights
+class RateTable:
+    def __init__(self, rates):
+        self.start=min((rate.start_date for rate in rates), default=date.today())
+        self.days=(max((rate.end_date for rate in rates), default=self.start) - self.start).days
+
+        nightly={room_type: [None] * self.days for room_type in models.RoomType}
+        for rate in sorted(rates, key=_precedence):
+            nights=nightly[rate.room_type]
+            first=(rate.start_date - self.start).days
+            last=(rate.end_date - self.start).days
+            step=1
+
+            if rate.weekday is not None:
+                first+=(rate.weekday - rate.start_date.weekday()) % 7
+                step=7
+
+            for offset in range(first, last, step):
+                nights[offset]=rate.rate
+
+        #_sums[t][i]: sum of the rates of the first i nights, _priced[t][i]: how many of them have a rate
+        self._sums={room_type: list(accumulate((night or Decimal(0) for night in nights), initial=Decimal(0)))
+            for room_type, nights in nightly.items()}
+        self._priced={room_type: list(accumulate((night is not None for night in nights), initial=0))
+            for room_type, nights in nightly.items()}
+
+    def _index(self, day:date):
+        return min(max((day - self.start).days, 0), self.days)
+
+    #nights no rate covers are charged base_price (the room's own price)
+    def total(self, room_type:models.RoomType, base_price:Decimal, check_in:date, check_out:date):
+        first, last=self._index(check_in), self._index(check_out)
+        sums, priced=self._sums[room_type], self._priced[room_type]
+
+        unpriced=(check_out - check_in).days - (priced[last] - priced[first])
+        return (sums[last] - sums[first] + unpriced * base_price).quantize(CENTS)
+
+#all rates, kept in the shared cache until a rate write invalidates it; see RoomCatalog
+class RateCalendar:
+    def __init__(self):
+        self.cache=get_cache("rates", schemas.RateCalendarSnapshot, ttl=settings.room_catalog_ttl, maxsize=1)
+        self._table=None
+        self._version=None
+
+    async def invalidate(self):
+        await self.cache.delete("all")
+
+    async def snapshot(self, db):
+        snapshot=await self.cache.get("all")
+        if snapshot is not None:
+            return snapshot
+
+        generation=await self.cache.generation()
+        rates=[schemas.RoomRateResponse.model_validate(rate) for rate in
+            (await db.exec(select(models.RoomRate).order_by(models.RoomRate.id))).scalars().all()]
+
+        snapshot=schemas.RateCalendarSnapshot(version=hashlib.sha1(to_json(rates)).hexdigest()[:16], rates=rates)
+
+        #not stored if any worker invalidated while loading, the next reader reloads
+        await self.cache.set("all", snapshot, generation=generation)
+
+        return snapshot
+
+    #RateTable for the current snapshot, rebuilt only when the rates change
+    async def table(self, db):
+        snapshot=await self.snapshot(db)
+
+        if snapshot.version != self._version:
+            self._table=RateTable(snapshot.rates)
+            self._version=snapshot.version
+
+        return self._table
+
+rate_calendar=RateCalendar()
+
+#room quotes for [check_in, check_out) priced in one query: a row per room and night,
+#each night joined to the winning rate of the room's type, summed per room
+def quote_statement(check_in:date, check_out:date):
+    nights=select(
+        func.generate_series(check_in, check_out - timedelta(days=1), timedelta(days=1)).cast(Date).label("night")
+    ).subquery("nights")
+
+    rate=select(models.RoomRate.rate).where(
+        models.RoomRate.room_type == models.Room.room_type,
+        models.RoomRate.start_date <= nights.c.night,
+        models.RoomRate.end_date > nights.c.night,
+        or_(models.RoomRate.weekday.is_(None), models.RoomRate.weekday == extract("isodow", nights.c.night) - 1)
+    ).order_by(
+        models.RoomRate.priority.desc(), models.RoomRate.weekday.is_(None), models.RoomRate.id.desc()
+    ).limit(1).lateral("nightly_rate")
+
+    return select(
+        models.Room.id.label("room_id"),
+        models.Room.room_number,
+        models.Room.room_type,
+        func.count().label("nights"),
+        func.sum(func.coalesce(rate.c.rate, models.Room.price)).label("total")
+    ).select_from(models.Room).join(nights, true()).outerjoin(rate, true()).group_by(models.Room.id).order_by(models.Room.room_number)
+
+def room_quote(room_id:int, room_number:int, room_type:models.RoomType, nights:int, total:Decimal):
+    return schemas.RoomQuote(
+        room_id=room_id,
+        room_number=room_number,
+        room_type=room_type,
+        nights=nights,
+        total=Decimal(total).quantize(CENTS),
+        average_nightly_rate=(Decimal(total) / nights).quantize(CENTS))
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import logging
+import psycopg
+from . import database, models
+from .catalog import room_catalog
+
+logger=logging.getLogger(__name__)
+
+ROOM_CHANNEL="room_changes"
+#events buffered per socket before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE=256
+RECONNECT_DELAY=5
+
+#in-process fan-out of room changes to the open /ws/rooms sockets
+class RoomHub:
+    def __init__(self):
+        self.subscribers=set()
+
+    def subscribe(self):
+        queue=asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event:dict):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                #a socket that fell behind gets a fresh snapshot rather than a partial stream
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+room_hub=RoomHub()
+
+#trigger payload -> delta sent to clients, statuses in their api spelling
+def _room_event(payload:str):
+    room=json.loads(payload)
+    room["status"]=models.RoomStatus[room["status"]].value
+    return {"type": "room", "room": room}
+
+#LISTEN on the room_changes channel fed by the rooms trigger and publish every change, forever.
+#a dedicated autocommit connection outside the pool. any failure (dropped connection, InterfaceError, ...)
+#is logged and the connection retried, so the task never dies and leaves sockets without updates.
+async def listen_for_room_changes():
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(database.DATABASE_URL, autocommit=True) as connection:
+                await connection.execute(f"LISTEN {ROOM_CHANNEL}")
+                #changes may have been missed while disconnected
+                room_hub.publish({"type": "resync"})
+
+                async for notify in connection.notifies():
+                    #another worker's write leaves this worker's copy of the catalog stale
+                    room_catalog.cache.evict_local("all")
+
+                    try:
+                        event=_room_event(notify.payload)
+                    except (ValueError, KeyError):
+                        #a payload we cannot read: clients reload the whole catalog instead
+                        logger.exception("unreadable room change payload %r", notify.payload)
+                        event={"type": "resync"}
+
+                    room_hub.publish(event)
+        except Exception:
+            logger.exception("room change listener failed, reconnecting")
+            await asyncio.sleep(RECONNECT_DELAY)
@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+from enum import StrEnum
+from sqlalchemy import Date, and_, case, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from . import database, models
+from .config import settings
+
+class Granularity(StrEnum):
+    DAY="day"
+    WEEK="week"
+    MONTH="month"
+
+#one row per calendar day in [start, end)
+def _days(start:date, end:date):
+    return select(
+        func.generate_series(start, end - timedelta(days=1), timedelta(days=1)).cast(Date).label("day")
+    ).subquery("days")
+
+#revenue of one night of a stay. the quoted total is split into whole cents, the last night
+#taking the remainder, so the nights of a stay add up exactly to what it is billed.
+def night_revenue(day):
+    nights=models.Reservation.check_out - models.Reservation.check_in
+    share=func.round(models.Reservation.quoted_total / nights, 2)
+
+    return case(
+        (models.Reservation.quoted_total.is_(None), models.Reservation.per_night_rate),
+        (day == models.Reservation.check_out - 1, models.Reservation.quoted_total - share * (nights - 1)),
+        else_=share)
+
+#rooms sold and room revenue per night, computed from reservations.
+#daterange @> day is answered by the reservation_room_no_overlap GiST index.
+def _live_nights(start:date, end:date):
+    days=_days(start, end)
+    stayed=and_(
+        models.Reservation.status != literal_column("'CANCELLED'"),
+        func.daterange(models.Reservation.check_in, models.Reservation.check_out).op("@>")(days.c.day))
+
+    return select(
+        days.c.day,
+        func.count(models.Reservation.id).label("rooms_sold"),
+        func.coalesce(func.sum(night_revenue(days.c.day)), 0).label("revenue")
+    ).select_from(days).outerjoin(models.Reservation, stayed).group_by(days.c.day)
+
+#same shape, read from the daily_occupancy rollup
+def _rollup_nights(start:date, end:date):
+    days=_days(start, end)
+
+    return select(
+        days.c.day,
+        func.coalesce(models.DailyOccupancy.rooms_sold, 0).label("rooms_sold"),
+        func.coalesce(models.DailyOccupancy.revenue, 0).label("revenue")
+    ).select_from(days).outerjoin(models.DailyOccupancy, models.DailyOccupancy.day == days.c.day)
+
+#rooms available, sold and revenue per period in a single query.
+#capacity is today's count of active rooms.
+async def occupancy_series(db, start:date, end:date, granularity:Granularity):
+    nights=(_rollup_nights(start, end) if settings.reports_use_rollup else _live_nights(start, end)).subquery("nights")
+    active_rooms=select(func.count(models.Room.id)).where(models.Room.is_active == True).scalar_subquery()
+    #inlined rather than bound so SELECT and GROUP BY carry the identical expression
+    period=func.date_trunc(literal_column(f"'{granularity.value}'"), nights.c.day)
+
+    query=select(
+        period.cast(Date).label("period"),
+        (func.count() * active_rooms).label("room_nights_available"),
+        func.sum(nights.c.rooms_sold).label("room_nights_sold"),
+        func.sum(nights.c.revenue).label("revenue")
+    ).group_by(period).order_by(period)
+
+    return (await db.exec(query)).all()
+
+#upsert of the rollup rows for every day in [start, end), revenue split by night_revenue like the live report
+def rollup_refresh_statement(start:date, end:date):
+    nights=_live_nights(start, end).subquery("nights")
+
+    statement=insert(models.DailyOccupancy).from_select(
+        ["day", "rooms_sold", "revenue", "refreshed_at"],
+        select(nights.c.day, nights.c.rooms_sold, nights.c.revenue, func.now()))
+
+    return statement.on_conflict_do_update(
+        index_elements=["day"],
+        set_={
+            "rooms_sold": statement.excluded.rooms_sold,
+            "revenue": statement.excluded.revenue,
+            "refreshed_at": statement.excluded.refreshed_at,
+        })
+
+#recompute the rollup rows for every day in [start, end)
+async def refresh_daily_rollup(start:date, end:date):
+    async with database.session_scope() as db:
+        await db.exec(rollup_refresh_statement(start, end))
+        await db.commit()
+
+#schedule a rollup refresh for the nights of changed reservations, after the response is sent
+def schedule_rollup_refresh(background_tasks, reservations):
+    if not settings.reports_use_rollup or not reservations:
+        return
+
+    start=min(reservation.check_in for reservation in reservations)
+    end=max(reservation.check_out for reservation in reservations)
+    background_tasks.add_task(refresh_daily_rollup, start, end)
@@ -0,0 +1,14 @@
+from decimal import Decimal
+import orjson
+from fastapi.responses import JSONResponse
+
+#orjson handles datetime/date/enum natively; Decimal goes out as a string, like pydantic's json mode
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+#default response class of the app
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
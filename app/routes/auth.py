@@ -9,16 +9,23 @@ router=APIRouter(
 )
 
 @router.post("/", response_model=schemas.TokenResponse)
-def login(db=Depends(database.get_session), user_credentials:OAuth2PasswordRequestForm=Depends()):
-    user=db.exec(select(models.User).where(models.User.username==user_credentials.username)).first()
+async def login(db=Depends(database.get_session), user_credentials:OAuth2PasswordRequestForm=Depends()):
+    user=(await db.exec(select(models.User).where(models.User.username==user_credentials.username))).first()
 
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Credentials.")
     
-    if not utils.verify(user_credentials.password, user.hashed_password):
+    valid, new_hash= await utils.verify_in_pool(user_credentials.password, user.hashed_password)
+
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Credentials.")
+
+    #rehash with the configured bcrypt cost
+    if new_hash:
+        user.hashed_password=new_hash
+        await db.commit()
     
-    token= oauth2.get_token({"user_id":user.id})
+    token= oauth2.get_user_token(user)
 
     return {
        "access_token":token,
@@ -0,0 +1,118 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import false, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .. import models,schemas,database,rbac,oauth2,pagination
+
+router=APIRouter(
+    prefix="/bills",
+    tags=["Bills"]
+)
+
+#bill every reservation checked out on checkout_date in one INSERT ... SELECT.
+#totals are the quoted stay total, or nights * per_night_rate for stays without one, computed as numeric
+#in postgres; already billed stays are skipped.
+@router.post("/generate", response_model=List[schemas.BillResponse])
+async def generate_bills(
+    checkout_date: date,
+    db: AsyncSession = Depends(database.get_session),
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin", "staff"]))):
+
+    billable= select(
+        models.Reservation.id,
+        func.coalesce(
+            models.Reservation.quoted_total,
+            (models.Reservation.check_out - models.Reservation.check_in) * models.Reservation.per_night_rate),
+        false(),
+        func.now()
+    ).where(
+        models.Reservation.status == models.ReservationStatus.CHECKED_OUT,
+        models.Reservation.check_out == checkout_date)
+
+    statement= insert(models.Bill).from_select(
+        ["reservation_id", "total_amount", "paid", "created_at"], billable
+    ).on_conflict_do_nothing(index_elements=["reservation_id"]).returning(models.Bill)
+
+    bills= (await db.scalars(statement)).all()
+    await db.commit()
+
+    return bills
+
+#ledger totals split by paid/unpaid
+@router.get("/summary", response_model=List[schemas.BillLedgerEntry])
+async def get_bill_summary(
+    db: AsyncSession = Depends(database.get_read_session),
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin"])),
+    created_from: Optional[date]=None,
+    created_to: Optional[date]=None):
+
+    query= select(
+        models.Bill.paid,
+        func.count(models.Bill.id).label("bills"),
+        func.coalesce(func.sum(models.Bill.total_amount), 0).label("total_amount")
+    ).group_by(models.Bill.paid).order_by(models.Bill.paid)
+
+    if created_from:
+        query= query.where(models.Bill.created_at >= created_from)
+
+    if created_to:
+        query= query.where(models.Bill.created_at < created_to)
+
+    return (await db.exec(query)).all()
+
+#paid/unpaid ledger
+@router.get("/", response_model=List[schemas.BillResponse])
+async def get_all_bills(
+    response: Response,
+    db: AsyncSession = Depends(database.get_read_session),
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin", "staff"])),
+    page: pagination.Page=Depends(),
+    paid: Optional[bool]=None,
+    created_from: Optional[date]=None,
+    created_to: Optional[date]=None):
+
+    query= select(models.Bill)
+
+    if paid is not None:
+        query= query.where(models.Bill.paid == paid)
+
+    if created_from:
+        query= query.where(models.Bill.created_at >= created_from)
+
+    if created_to:
+        query= query.where(models.Bill.created_at < created_to)
+
+    return await pagination.paginate(db, query, models.Bill.id, page, response)
+
+@router.get("/{bill_id}", response_model=schemas.BillResponse)
+async def get_bill_by_id(
+    bill_id: int,
+    db: AsyncSession = Depends(database.get_read_session),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)):
+
+    bill= await db.get(models.Bill, bill_id)
+
+    if not bill:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Bill with id {bill_id} not found.")
+
+    return bill
+
+#mark a bill as paid
+@router.patch("/{bill_id}/pay", response_model=schemas.BillResponse)
+async def pay_bill(
+    bill_id: int,
+    db: AsyncSession = Depends(database.get_session),
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin", "staff"]))):
+
+    bill= (await db.scalars(
+        update(models.Bill).where(models.Bill.id == bill_id).values(paid=True).returning(models.Bill))).first()
+
+    if not bill:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Bill with id {bill_id} not found.")
+
+    await db.commit()
+
+    return bill
@@ -1,20 +1,28 @@
-from typing import List
-from fastapi import APIRouter, Depends,HTTPException, status
-from sqlalchemy import select
-from sqlmodel import Session
-from .. import models,schemas, database,rbac,oauth2
+from typing import List, Optional
+from fastapi import APIRouter, Depends,HTTPException, Query, Response, status
+from sqlalchemy import case, func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .. import models,schemas, database,rbac,oauth2,pagination,export,utils
+from ..config import settings
 
 router=APIRouter(
     prefix="/guests",
     tags=["Guests"]
 )
 
+#relationships available through ?expand=
+EXPANDABLE={
+    "reservations": models.Guest.reservations,
+}
+
 #Create guest
 @router.post("/", response_model=schemas.GuestResponse)
-def create_guest(guest_data: schemas.GuestCreate, db: Session=Depends(database.get_session),
-    current_user:models.User=Depends(rbac.require_roles(["admin","staff"]))):
+async def create_guest(guest_data: schemas.GuestCreate, db: AsyncSession=Depends(database.get_session),
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin","staff"]))):
 
-    existing_guest= db.exec(select(models.Guest).where(models.Guest.email == guest_data.email)).first()
+    existing_guest= (await db.exec(select(models.Guest).where(models.Guest.email == guest_data.email))).first()
 
     if existing_guest:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Guest with email {guest_data.email} already exists.")
@@ -22,25 +30,107 @@ def create_guest(guest_data: schemas.GuestCreate, db: Session=Depends(database.g
     guest= models.Guest(**guest_data.model_dump())
 
     db.add(guest)
-    db.commit()
-    db.refresh(guest)
+    await db.commit()
+    await db.refresh(guest)
 
     return guest
 
+#create many guests with one email lookup and one multi-row insert
+@router.post("/bulk", response_model=schemas.GuestBulkResponse)
+async def create_guests_bulk(guests_data: List[schemas.GuestCreate], db: AsyncSession=Depends(database.get_session),
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin","staff"]))):
+
+    if len(guests_data) > settings.bulk_max_items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {settings.bulk_max_items} guests per request.")
+
+    emails={guest.email for guest in guests_data}
+    taken=set((await db.exec(select(models.Guest.email).where(models.Guest.email.in_(emails)))).all())
+
+    rows=[]
+    errors=[]
+    for index, guest in enumerate(guests_data):
+        if guest.email in taken:
+            errors.append(schemas.BulkItemError(index=index, detail=f"Guest with email {guest.email} already exists."))
+            continue
+
+        #later duplicates inside the same batch are rejected too
+        taken.add(guest.email)
+        rows.append(guest.model_dump())
+
+    created=[]
+    if rows:
+        try:
+            created=(await db.scalars(insert(models.Guest).returning(models.Guest), rows)).all()
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Some guests were created concurrently, retry the batch.")
+
+    return {"created": created, "errors": errors}
+
 #get all guests
-@router.get("/", response_model=List[schemas.GuestResponse])
-def get_all_guests(db: Session = Depends(database.get_session),current_user: models.User=Depends(oauth2.get_current_user)):
-    
-    guests=db.exec(select(models.Guest)).all()
-    return guests
+@router.get("/", response_model=List[schemas.GuestDetailResponse], response_model_exclude_unset=True)
+async def get_all_guests(response: Response, db: AsyncSession = Depends(database.get_read_session),current_user: schemas.Principal=Depends(oauth2.get_current_user),
+    page: pagination.Page=Depends(), email: Optional[str]=None, phone: Optional[str]=None, expand: Optional[str]=None):
+
+    expanded, options= utils.expand_options(expand, EXPANDABLE)
+
+    query=select(models.Guest).options(*options)
+
+    #prefix matches, e.g. ?email=john or ?phone=+977
+    if email:
+        query=query.where(models.Guest.email.startswith(email, autoescape=True))
+
+    if phone:
+        query=query.where(models.Guest.phone.startswith(phone, autoescape=True))
+
+    guests=await pagination.paginate(db, query, models.Guest.id, page, response)
+    return utils.expanded_list_response(schemas.GuestDetailResponse, schemas.GuestResponse, guests, expanded, response)
+
+#export guests as NDJSON/CSV, streamed from a server-side cursor
+@router.get("/export")
+async def export_guests(current_user:schemas.Principal=Depends(rbac.require_roles(["admin"])),
+    export_format: export.ExportFormat=export.ExportFormat.NDJSON, email: Optional[str]=None, phone: Optional[str]=None):
+
+    query=select(*models.Guest.__table__.columns).order_by(models.Guest.id)
+
+    if email:
+        query=query.where(models.Guest.email.startswith(email, autoescape=True))
+
+    if phone:
+        query=query.where(models.Guest.phone.startswith(phone, autoescape=True))
+
+    return export.export_response(query, export_format, "guests")
+
+#returning guests by name, email or phone: prefix matches first, then by trigram word similarity.
+#every arm of the OR is answered by the guests' trigram GIN indexes.
+@router.get("/search", response_model=List[schemas.GuestResponse])
+async def search_guests(response: Response, q: str=Query(min_length=1, max_length=100), limit: int=Query(20, ge=1, le=100),
+    db: AsyncSession=Depends(database.get_read_session), current_user:schemas.Principal=Depends(oauth2.get_current_user)):
+
+    fields=[models.Guest.name, models.Guest.email, models.Guest.phone]
+
+    #plain ILIKE on the column (not lower(column) LIKE) so the trigram index applies
+    pattern=q.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+    prefix=or_(*(field.ilike(pattern, escape="/") for field in fields))
+    similar=or_(*(field.op("%>")(q) for field in fields))
+
+    score=case((prefix, 1.0), else_=0.0) + func.greatest(*(func.word_similarity(q, field) for field in fields))
+
+    query=select(models.Guest).where(or_(prefix, similar)).order_by(score.desc(), models.Guest.id).limit(limit)
+
+    guests=(await db.exec(query)).all()
+    return utils.json_list_response(schemas.GuestResponse, [utils.trusted_model(schemas.GuestResponse, guest) for guest in guests], response)
 
 #get guest by id
-@router.get("/{guest_id}", response_model=schemas.GuestResponse)
-def get_guest_by_id(guest_id: int, db: Session=Depends(database.get_session),
-                    current_user:models.User=Depends(oauth2.get_current_user)):
+@router.get("/{guest_id}", response_model=schemas.GuestDetailResponse, response_model_exclude_unset=True)
+async def get_guest_by_id(guest_id: int, db: AsyncSession=Depends(database.get_read_session),
+                    current_user:schemas.Principal=Depends(oauth2.get_current_user), expand: Optional[str]=None):
     
-    guest= db.get(models.Guest, guest_id)
+    expanded, options= utils.expand_options(expand, EXPANDABLE)
+
+    guest= await db.get(models.Guest, guest_id, options=options)
 
     if not guest:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Guest with id {guest_id} not found.")
-    return guest
\ No newline at end of file
+    return utils.expanded_response(schemas.GuestDetailResponse, schemas.GuestResponse, guest, expanded)
\ No newline at end of file
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from .. import database,rbac,schemas,cache,scheduler,instrumentation
+
+router=APIRouter(
+    prefix="/internal",
+    tags=["Internal"]
+)
+
+#connection pool usage, for sizing the pool against the worker count
+@router.get("/pool")
+async def get_pool_status(current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+    return database.pool_status()
+
+#hit/miss counters of every cache namespace
+@router.get("/cache")
+async def get_cache_stats(current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+    return cache.cache_stats()
+
+#normalized statements with the most total time since the last statement stats report
+@router.get("/queries")
+async def get_top_queries(limit:int=20, current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+    return instrumentation.top_statements(limit)
+
+#apply today's status transitions now instead of waiting for the scheduler
+@router.post("/transitions/run")
+async def run_transitions(current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+    result=await scheduler.run_daily_transitions()
+
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Status transitions are already running.")
+
+    return result
\ No newline at end of file
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from .. import instrumentation
+
+router=APIRouter(
+    tags=["Metrics"]
+)
+
+#Prometheus scrape endpoint, only mounted when settings.metrics_enabled
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
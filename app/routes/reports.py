@@ -0,0 +1,77 @@
+from datetime import date
+from decimal import Decimal
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .. import schemas,database,rbac,reporting
+
+router=APIRouter(
+    prefix="/reports",
+    tags=["Reports"]
+)
+
+MAX_REPORT_DAYS=3 * 366
+
+def _ratio(numerator, denominator, places="0.01"):
+    if not denominator:
+        return Decimal(0)
+    return (Decimal(numerator) / Decimal(denominator)).quantize(Decimal(places))
+
+def _validate_range(start:date, end:date):
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End date must be after start date.")
+
+    if (end - start).days > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Reports cover at most {MAX_REPORT_DAYS} days.")
+
+#occupancy rate per period for nights in [start, end)
+@router.get("/occupancy", response_model=List[schemas.OccupancyPoint])
+async def get_occupancy_report(
+    start: date,
+    end: date,
+    granularity: reporting.Granularity=reporting.Granularity.DAY,
+    db: AsyncSession = Depends(database.get_read_session),
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin"]))):
+
+    _validate_range(start, end)
+
+    return [
+        schemas.OccupancyPoint(
+            period=row.period,
+            room_nights_available=row.room_nights_available,
+            room_nights_sold=row.room_nights_sold,
+            occupancy_rate=_ratio(row.room_nights_sold, row.room_nights_available, "0.0001"))
+        for row in await reporting.occupancy_series(db, start, end, granularity)
+    ]
+
+#revenue, ADR (revenue per room sold) and RevPAR (revenue per room available) per period
+@router.get("/revenue", response_model=List[schemas.RevenuePoint])
+async def get_revenue_report(
+    start: date,
+    end: date,
+    granularity: reporting.Granularity=reporting.Granularity.DAY,
+    db: AsyncSession = Depends(database.get_read_session),
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin"]))):
+
+    _validate_range(start, end)
+
+    return [
+        schemas.RevenuePoint(
+            period=row.period,
+            room_nights_sold=row.room_nights_sold,
+            revenue=row.revenue,
+            adr=_ratio(row.revenue, row.room_nights_sold),
+            revpar=_ratio(row.revenue, row.room_nights_available))
+        for row in await reporting.occupancy_series(db, start, end, granularity)
+    ]
+
+#backfill or repair the daily_occupancy rollup for [start, end)
+@router.post("/rollup/refresh", status_code=status.HTTP_204_NO_CONTENT)
+async def refresh_rollup(
+    start: date,
+    end: date,
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin"]))):
+
+    _validate_range(start, end)
+
+    await reporting.refresh_daily_rollup(start, end)
@@ -1,123 +1,330 @@
-from datetime import date
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from .. import models,database,schemas,rbac,oauth2
-from sqlmodel import Session, select
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
+from sqlalchemy import Date, Integer, column, insert, values
+from sqlalchemy.exc import IntegrityError, OperationalError
+from .. import models,database,schemas,rbac,oauth2,pagination,export,utils,reporting,rates
+from ..config import settings
+from ..catalog import room_catalog
+from ..rates import rate_calendar
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 router=APIRouter(
     prefix="/reservations",
     tags=['Reservations']
 )
 
+#relationships available through ?expand=
+EXPANDABLE={
+    "guest": models.Reservation.guest,
+    "room": models.Reservation.room,
+    "bill": models.Reservation.bill,
+}
+
+#the exclusion constraint that rejects double bookings
+OVERLAP_CONSTRAINT="reservation_room_no_overlap"
+
+DEADLOCK_DETECTED="40P01"
+
+#a double booking is a conflict, any other violated constraint is bad input reported with its cause
+def integrity_error(error:IntegrityError, conflict_detail:str):
+    if database.violated_constraint(error) == OVERLAP_CONSTRAINT:
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=conflict_detail)
+
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Reservation rejected: {database.error_message(error)}.")
+
+#stays overlapping [date_from, date_to), plus exact status / room filters
+def filter_reservations(query, date_from: Optional[date]=None, date_to: Optional[date]=None,
+    reservation_status: Optional[models.ReservationStatus]=None, room_id: Optional[int]=None):
+
+    if date_from:
+        query= query.where(models.Reservation.check_out > date_from)
+
+    if date_to:
+        query= query.where(models.Reservation.check_in < date_to)
+
+    if reservation_status:
+        query= query.where(models.Reservation.status == reservation_status)
+
+    if room_id:
+        query= query.where(models.Reservation.room_id == room_id)
+
+    return query
+
 #create reservation
 
 @router.post("/", response_model=schemas.ReservationResponse)
-def create_reservation(
+async def create_reservation(
     reservation_data: schemas.ReservationCreate, 
-    db: Session = Depends(database.get_session), current_user: models.User= Depends(rbac.require_roles(["admin", "staff"]))):
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(database.get_session), current_user: schemas.Principal= Depends(rbac.require_roles(["admin", "staff"]))):
+
+    #validate dates
+    if reservation_data.check_out <= reservation_data.check_in:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Check-out date must be after check-in date.")
 
-    room = db.get(models.Room, reservation_data.room_id)
+    #one transaction: the room row stays locked until commit, so concurrent bookings for it queue up here
+    room = (await db.exec(select(models.Room).where(models.Room.id == reservation_data.room_id).with_for_update())).first()
 
     if not room or not room.is_active:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Room with id {reservation_data.room_id} not found or inactive.")
     
-    if room.status != models.RoomStatus.AVAILABLE:
+    #overlapping stays are rejected by the reservation_room_no_overlap constraint below
+    if room.status == models.RoomStatus.MAINTENANCE:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Room {room.room_number} is not available for reservation.")
     
-
-    #validate dates
-    if reservation_data.check_out <= reservation_data.check_in:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Check-out date must be after check-in date.")
-    
     #validate guest exists
-    guest= db.get(models.Guest, reservation_data.guest_id)
+    guest= await db.get(models.Guest, reservation_data.guest_id)
 
     if not guest:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Guest with id {reservation_data.guest_id} not found. Please create the guest first.")
     
-    per_night_rate = room.price
-
-    reservation= models.Reservation(
-        guest_id=guest.id,
-        room_id=room.id,
-        check_in=reservation_data.check_in,
-        check_out=reservation_data.check_out,
-        no_of_guests=reservation_data.no_of_guests,
-        per_night_rate=per_night_rate,
-        status=models.ReservationStatus.RESERVED
-    )
-
-    db.add(reservation)
-    db.commit()
-    db.refresh(reservation)
-
-    #update room status to occupied if check-in date is today
+    #the stay is billed at the quoted total; per_night_rate keeps its rounded average for display and reports
+    quote=(await db.exec(rates.quote_statement(reservation_data.check_in, reservation_data.check_out).where(models.Room.id == room.id))).one()
+    quote=rates.room_quote(**quote._mapping)
+    per_night_rate = quote.average_nightly_rate
+
+    try:
+        reservation=(await db.scalars(insert(models.Reservation).values(
+            guest_id=guest.id,
+            room_id=room.id,
+            check_in=reservation_data.check_in,
+            check_out=reservation_data.check_out,
+            no_of_guests=reservation_data.no_of_guests,
+            per_night_rate=per_night_rate,
+            quoted_total=quote.total,
+            status=models.ReservationStatus.RESERVED,
+            created_at=datetime.now(timezone.utc)
+        ).returning(models.Reservation))).one()
+
+        #update room status to occupied if check-in date is today, flushed with the commit
+        if reservation.check_in == date.today():
+            room.status = models.RoomStatus.OCCUPIED
+
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        raise integrity_error(error, f"Room with id {reservation_data.room_id} is already booked between {reservation_data.check_in} and {reservation_data.check_out}.")
+
     if reservation.check_in == date.today():
-        room.status = models.RoomStatus.OCCUPIED
-        db.commit()
-        db.refresh(room)
+        await room_catalog.invalidate()
+
+    reporting.schedule_rollup_refresh(background_tasks, [reservation])
 
     return reservation
     
+#create many reservations: one room lookup, one guest lookup, one overlap check and one insert for the whole batch
+@router.post("/bulk", response_model=schemas.ReservationBulkResponse)
+async def create_reservations_bulk(
+    reservations_data: List[schemas.ReservationCreate],
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(database.get_session), current_user: schemas.Principal= Depends(rbac.require_roles(["admin", "staff"]))):
+
+    if len(reservations_data) > settings.bulk_max_items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {settings.bulk_max_items} reservations per request.")
+
+    #locked in id order so overlapping imports queue up instead of deadlocking
+    room_ids={item.room_id for item in reservations_data}
+    try:
+        rooms={room.id: room for room in (await db.exec(
+            select(models.Room).where(models.Room.id.in_(room_ids)).order_by(models.Room.id).with_for_update())).all()}
+    except OperationalError as error:
+        if database.sqlstate(error) != DEADLOCK_DETECTED:
+            raise
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Some rooms were locked by a concurrent booking, retry the batch.")
+
+    guest_ids={item.guest_id for item in reservations_data}
+    known_guests=set((await db.exec(select(models.Guest.id).where(models.Guest.id.in_(guest_ids)))).all())
+
+    errors={}
+    for index, item in enumerate(reservations_data):
+        room=rooms.get(item.room_id)
+
+        if not room or not room.is_active:
+            errors[index]=f"Room with id {item.room_id} not found or inactive."
+        elif room.status == models.RoomStatus.MAINTENANCE:
+            errors[index]=f"Room {room.room_number} is not available for reservation."
+        elif item.check_out <= item.check_in:
+            errors[index]="Check-out date must be after check-in date."
+        elif item.guest_id not in known_guests:
+            errors[index]=f"Guest with id {item.guest_id} not found. Please create the guest first."
+
+    candidates=[index for index in range(len(reservations_data)) if index not in errors]
+
+    #clashes with existing stays, checked for every candidate in one query
+    if candidates:
+        stays=values(column("idx", Integer), column("room_id", Integer), column("check_in", Date), column("check_out", Date), name="stays").data(
+            [(index, reservations_data[index].room_id, reservations_data[index].check_in, reservations_data[index].check_out) for index in candidates])
+
+        booked=select(models.Reservation.id).where(
+            models.Reservation.room_id == stays.c.room_id,
+            utils.stay_overlaps(stays.c.check_in, stays.c.check_out))
+
+        for index in (await db.exec(select(stays.c.idx).where(booked.exists()))).all():
+            errors[index]=f"Room with id {reservations_data[index].room_id} is already booked between {reservations_data[index].check_in} and {reservations_data[index].check_out}."
+
+    #clashes inside the batch itself: first come, first served per room
+    accepted={}
+    for index in sorted((i for i in candidates if i not in errors), key=lambda i: (reservations_data[i].room_id, reservations_data[i].check_in)):
+        item=reservations_data[index]
+        previous=accepted.get(item.room_id)
+
+        if previous is not None and previous.check_out > item.check_in:
+            errors[index]=f"Room with id {item.room_id} is booked twice in this batch between {item.check_in} and {previous.check_out}."
+            continue
+
+        accepted[item.room_id]=item
+
+    created_at=datetime.now(timezone.utc)
+    today=date.today()
+    table=await rate_calendar.table(db)
+    rows=[]
+    for index, item in enumerate(reservations_data):
+        if index in errors:
+            continue
+
+        room=rooms[item.room_id]
+        quoted_total=table.total(room.room_type, room.price, item.check_in, item.check_out)
+
+        rows.append(dict(
+            guest_id=item.guest_id,
+            room_id=item.room_id,
+            check_in=item.check_in,
+            check_out=item.check_out,
+            no_of_guests=item.no_of_guests,
+            per_night_rate=(quoted_total / (item.check_out - item.check_in).days).quantize(rates.CENTS),
+            quoted_total=quoted_total,
+            status=models.ReservationStatus.RESERVED,
+            created_at=created_at))
+
+        #update room status to occupied if check-in date is today
+        if item.check_in == today:
+            rooms[item.room_id].status=models.RoomStatus.OCCUPIED
+
+    created=[]
+    if rows:
+        try:
+            created=(await db.scalars(insert(models.Reservation).returning(models.Reservation), rows)).all()
+            await db.commit()
+        except IntegrityError as error:
+            await db.rollback()
+            raise integrity_error(error, "Some rooms were booked concurrently, retry the batch.")
+        except OperationalError as error:
+            if database.sqlstate(error) != DEADLOCK_DETECTED:
+                raise
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Some rooms were locked by a concurrent booking, retry the batch.")
+
+        if any(reservation.check_in == today for reservation in created):
+            await room_catalog.invalidate()
+
+        reporting.schedule_rollup_refresh(background_tasks, created)
+
+    return {
+        "created": created,
+        "errors": [schemas.BulkItemError(index=index, detail=detail) for index, detail in sorted(errors.items())]
+    }
+
 #Get all reservations
 
-@router.get("/", response_model=List[schemas.ReservationResponse])
-def get_all_reservations(
-    db: Session = Depends(database.get_session),
-    current_user: models.User = Depends(oauth2.get_current_user)):
+@router.get("/", response_model=List[schemas.ReservationDetailResponse], response_model_exclude_unset=True)
+async def get_all_reservations(
+    response: Response,
+    db: AsyncSession = Depends(database.get_read_session),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user),
+    page: pagination.Page=Depends(),
+    date_from: Optional[date]=None,
+    date_to: Optional[date]=None,
+    reservation_status: Optional[models.ReservationStatus]=None,
+    room_id: Optional[int]=None,
+    expand: Optional[str]=None):
+
+    expanded, options= utils.expand_options(expand, EXPANDABLE)
 
 #admin can see all reservations, staff sees only future reservations.
-    query= select(models.Reservation)
+    query= select(models.Reservation).options(*options)
     if current_user.role== "staff":
         query= query.where(models.Reservation.check_out >= date.today())
 
-    reservations = db.exec(query).all()
+    query= filter_reservations(query, date_from, date_to, reservation_status, room_id)
+
+    reservations = await pagination.paginate(db, query, models.Reservation.id, page, response)
+
+    return utils.expanded_list_response(schemas.ReservationDetailResponse, schemas.ReservationResponse, reservations, expanded, response)
+
+#export reservations as NDJSON/CSV, streamed from a server-side cursor
+@router.get("/export")
+async def export_reservations(
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin"])),
+    export_format: export.ExportFormat=export.ExportFormat.NDJSON,
+    date_from: Optional[date]=None,
+    date_to: Optional[date]=None,
+    reservation_status: Optional[models.ReservationStatus]=None,
+    room_id: Optional[int]=None):
 
-    return reservations
+    query= select(*models.Reservation.__table__.columns).order_by(models.Reservation.id)
+    query= filter_reservations(query, date_from, date_to, reservation_status, room_id)
+
+    return export.export_response(query, export_format, "reservations")
 
 #get reservation by id 
-@router.get("/{reservation_id}", response_model=schemas.ReservationResponse)
-def get_reservation_by_id(
+@router.get("/{reservation_id}", response_model=schemas.ReservationDetailResponse, response_model_exclude_unset=True)
+async def get_reservation_by_id(
     reservation_id:int,
-    db: Session = Depends(database.get_session),
-    current_user: models.User = Depends(oauth2.get_current_user)):
+    db: AsyncSession = Depends(database.get_read_session),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user),
+    expand: Optional[str]=None):
+
+    expanded, options= utils.expand_options(expand, EXPANDABLE)
 
-    reservation= db.get(models.Reservation, reservation_id)
+    reservation= await db.get(models.Reservation, reservation_id, options=options)
 
     if not reservation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Reservation with id {reservation_id} not found.")
     
-    return reservation
+    return utils.expanded_response(schemas.ReservationDetailResponse, schemas.ReservationResponse, reservation, expanded)
 
 #Update reservation status
 @router.patch("/{reservation_id}/status", response_model=schemas.ReservationResponse)
-def update_reservation_status(
+async def update_reservation_status(
     reservation_id : int,
     new_status: models.ReservationStatus,
-    db: Session = Depends(database.get_session),
-    current_user: models.User = Depends(rbac.require_roles(["admin", "staff"]))):
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(database.get_session),
+    current_user: schemas.Principal = Depends(rbac.require_roles(["admin", "staff"]))):
 
-    reservation= db.get(models.Reservation, reservation_id)
+    #reservation and its room locked in one roundtrip, both updates flushed by a single commit
+    row= (await db.exec(
+        select(models.Reservation, models.Room)
+        .join(models.Room, models.Room.id == models.Reservation.room_id)
+        .where(models.Reservation.id == reservation_id)
+        .with_for_update())).first()
 
-    if not reservation:
+    if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Reservation with id {reservation_id} not found.")
-    
+
+    reservation, room= row
+
     #update status
     reservation.status = new_status
-    db.commit()
-    db.refresh(reservation)
 
     #update room status based on reservation
-
-    room= db.get(models.Room, reservation.room_id)
-
     if new_status == models.ReservationStatus.CHECKED_IN:
         room.status = models.RoomStatus.OCCUPIED
 
     elif new_status in [models.ReservationStatus.CHECKED_OUT, models.ReservationStatus.CANCELLED]:
         room.status= models.RoomStatus.AVAILABLE
 
-    db.commit()
-    db.refresh(room)
+    try:
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        raise integrity_error(error, f"Reservation with id {reservation_id} overlaps another booking for its room.")
+
+    await room_catalog.invalidate()
+
+    reporting.schedule_rollup_refresh(background_tasks, [reservation])
 
     return reservation
\ No newline at end of file
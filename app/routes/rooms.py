@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends,HTTPException, status
-from sqlmodel import Session, select, asc
-from .. import models,schemas,database,rbac,oauth2
+from datetime import date
+from fastapi import APIRouter, Depends,HTTPException, Request, Response, status
+from sqlmodel import select, asc
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .. import models,schemas,database,rbac,oauth2,utils,pagination,rates
+from ..catalog import room_catalog
+from ..rates import rate_calendar
 from typing import List, Optional
 
 router=APIRouter(
@@ -8,61 +12,231 @@ router=APIRouter(
     tags=["Rooms"]
 )
 
+#reads are served from room_catalog; clients revalidate with If-None-Match and get a 304 while nothing changed
+def not_modified(request:Request, response:Response, etag:str):
+    response.headers["ETag"]=etag
+    response.headers["Cache-Control"]="no-cache"
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @router.post("/", response_model=models.Room)
-def add_new_room(room_data:schemas.RoomCreate,db:database.SessionLocal,current_user:models.User=Depends(rbac.require_roles(["admin"]))):
+async def add_new_room(room_data:schemas.RoomCreate,db:database.SessionLocal,current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
 
-    existing_room=db.exec(select(models.Room).where(models.Room.room_number==room_data.room_number)).first()
+    existing_room=(await db.exec(select(models.Room).where(models.Room.room_number==room_data.room_number))).first()
 
     if existing_room:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Room {room_data.room_number} already exists.")
     
     room = models.Room(**room_data.model_dump())
     db.add(room)
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await room_catalog.invalidate()
+    await db.refresh(room)
 
     return room
 
 @router.get("/", response_model=List[models.Room])
-def get_all_rooms(
+async def get_all_rooms(
+    request: Request,
+    response: Response,
     db:database.SessionLocal,
-    current_user:models.User=Depends(oauth2.get_current_user),
+    current_user:schemas.Principal=Depends(oauth2.get_current_user),
     query_status: Optional[models.RoomStatus]=None, 
-    include_inactive: Optional[bool]=False):
+    include_inactive: Optional[bool]=False,
+    room_type: Optional[models.RoomType]=None,
+    page: pagination.Page=Depends()):
     
-    query=select(models.Room).order_by(asc(models.Room.room_number))
-
     if include_inactive and current_user.role != ["admin"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view inactive rooms.")
+
+    catalog=await room_catalog.snapshot(db)
+
+    cached=not_modified(request, response, catalog.etag)
+    if cached:
+        return cached
+
+    rooms=catalog.rooms
     
     if not include_inactive:
-        query=query.where(models.Room.is_active == True)
+        rooms=[room for room in rooms if room.is_active]
 
     if query_status:
-        query=query.where(models.Room.status == query_status)
+        rooms=[room for room in rooms if room.status == query_status]
+
+    if room_type:
+        rooms=[room for room in rooms if room.room_type == room_type]
+
+    #ordered by room number, which is also the cursor
+    rooms=pagination.paginate_sorted(rooms, "room_number", page, response)
+    return utils.json_list_response(schemas.RoomResponse, rooms, response)
+
+#rooms free for the whole stay, answered by the reservation exclusion constraint's GiST index
+def available_rooms(check_in:date, check_out:date, capacity: Optional[int]=None, room_type: Optional[models.RoomType]=None):
+    if check_out <= check_in:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Check-out date must be after check-in date.")
+
+    booked=select(models.Reservation.id).where(
+        models.Reservation.room_id == models.Room.id,
+        utils.stay_overlaps(check_in, check_out))
+
+    criteria=[
+        models.Room.is_active == True,
+        models.Room.status != models.RoomStatus.MAINTENANCE,
+        ~booked.exists()]
+
+    if capacity:
+        criteria.append(models.Room.capacity >= capacity)
+
+    if room_type:
+        criteria.append(models.Room.room_type == room_type)
 
-    rooms=db.exec(query).all()
+    return criteria
+
+@router.get("/availability", response_model=List[models.Room])
+async def get_available_rooms(
+    check_in:date,
+    check_out:date,
+    db:database.ReadSessionLocal,
+    current_user:schemas.Principal=Depends(oauth2.get_current_user),
+    capacity: Optional[int]=None,
+    room_type: Optional[models.RoomType]=None):
+
+    query=select(models.Room).where(*available_rooms(check_in, check_out, capacity, room_type)).order_by(asc(models.Room.room_number))
+
+    rooms=(await db.exec(query)).all()
 
     return rooms
 
+#price a stay in the available rooms.
+#one room is summed night by night in postgres; a search prices every candidate from the in-memory rate table.
+@router.get("/quote", response_model=List[schemas.RoomQuote])
+async def get_room_quotes(
+    check_in:date,
+    check_out:date,
+    db:database.SessionLocal,
+    current_user:schemas.Principal=Depends(oauth2.get_current_user),
+    room_id: Optional[int]=None,
+    capacity: Optional[int]=None,
+    room_type: Optional[models.RoomType]=None):
+
+    criteria=available_rooms(check_in, check_out, capacity, room_type)
+
+    if room_id:
+        rows=(await db.exec(rates.quote_statement(check_in, check_out).where(models.Room.id == room_id, *criteria))).all()
+        return [rates.room_quote(**row._mapping) for row in rows]
+
+    rooms=(await db.exec(select(models.Room).where(*criteria).order_by(asc(models.Room.room_number)))).all()
+    table=await rate_calendar.table(db)
+    nights=(check_out - check_in).days
+
+    return [
+        rates.room_quote(room.id, room.room_number, room.room_type, nights, table.total(room.room_type, room.price, check_in, check_out))
+        for room in rooms
+    ]
+
+#Rate calendar
+
+@router.get("/rates", response_model=List[schemas.RoomRateResponse])
+async def get_room_rates(
+    db:database.SessionLocal,
+    current_user:schemas.Principal=Depends(oauth2.get_current_user),
+    room_type: Optional[models.RoomType]=None):
+
+    snapshot=await rate_calendar.snapshot(db)
+
+    return [rate for rate in snapshot.rates if room_type is None or rate.room_type == room_type]
+
+def validate_rate(rate_data:schemas.RoomRateCreate):
+    if rate_data.end_date <= rate_data.start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rate end date must be after its start date.")
+
+    if rate_data.weekday is not None and not 0 <= rate_data.weekday <= 6:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Weekday must be between 0 (monday) and 6 (sunday).")
+
+    if rate_data.rate <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rate must be positive.")
+
+@router.post("/rates", response_model=schemas.RoomRateResponse)
+async def add_room_rate(
+    rate_data:schemas.RoomRateCreate,
+    db:database.SessionLocal,
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+
+    validate_rate(rate_data)
+
+    rate=models.RoomRate(**rate_data.model_dump())
+    db.add(rate)
+    await db.commit()
+    await rate_calendar.invalidate()
+    await db.refresh(rate)
+
+    return rate
+
+@router.put("/rates/{rate_id}", response_model=schemas.RoomRateResponse)
+async def update_room_rate(
+    rate_id:int,
+    rate_data:schemas.RoomRateCreate,
+    db:database.SessionLocal,
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+
+    rate=await db.get(models.RoomRate, rate_id)
+
+    if not rate:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Rate with id: {rate_id} not found.")
+
+    validate_rate(rate_data)
+
+    for key,value in rate_data.model_dump().items():
+        setattr(rate,key,value)
+
+    await db.commit()
+    await rate_calendar.invalidate()
+    await db.refresh(rate)
+
+    return rate
+
+@router.delete("/rates/{rate_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_room_rate(
+    rate_id:int,
+    db:database.SessionLocal,
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+
+    rate=await db.get(models.RoomRate, rate_id)
+
+    if not rate:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Rate with id: {rate_id} not found.")
+
+    await db.delete(rate)
+    await db.commit()
+    await rate_calendar.invalidate()
+
 @router.get("/{room_id}",response_model=models.Room)
-def get_a_room(
+async def get_a_room(
     room_id:int,
+    request: Request,
+    response: Response,
     db:database.SessionLocal,
-    current_user:models.User=Depends(oauth2.get_current_user)):
+    current_user:schemas.Principal=Depends(oauth2.get_current_user)):
 
-    room=db.get(models.Room, room_id)
+    catalog=await room_catalog.snapshot(db)
+    room=await room_catalog.room(db, room_id)
     
+    #404 rules first, a catalog-wide ETag says nothing about whether this room is visible
     if not room or (not room.is_active and current_user.role != "admin"):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"Room with id:{room_id} not found")
 
+    cached=not_modified(request, response, catalog.etag)
+    if cached:
+        return cached
+
     return room
 
 
 # @router.delete("/{room_id}",status_code=status.HTTP_204_NO_CONTENT)
-# def delete_room(id:int, db:database.SessionLocal, current_user:models.User=Depends(rbac.require_roles(["admin"]))):
+# def delete_room(id:int, db:database.SessionLocal, current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
 #     room=db.get(models.Room, room_id)
 
 #     if not room:
@@ -75,14 +249,14 @@ def get_a_room(
 
 
 @router.delete("/{room_id}/soft", response_model=models.Room)
-def soft_delete_room(
+async def soft_delete_room(
     room_id:int, 
     db:database.SessionLocal,
-    current_user:models.User=Depends(rbac.require_roles(["admin"]))):
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
 
     #  Soft delete a room by marking it inactive.
 
-    room=db.get(models.Room, room_id)
+    room=await db.get(models.Room, room_id)
 
     if not room:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Room with id: {room_id} not found.")
@@ -90,48 +264,50 @@ def soft_delete_room(
     room.is_active=False
     room.status=models.RoomStatus.INACTIVE
 
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await room_catalog.invalidate()
+    await db.refresh(room)
     return room
 
 
 #Restore soft deleted room
 
 @router.patch("/{room_id}/restore", response_model=models.Room)
-def restore_room(
+async def restore_room(
     room_id:int, 
     db:database.SessionLocal,
-    current_user:models.User=Depends(rbac.require_roles(["admin"]))):
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
 
 #Restore a soft-deleted room to active status
-    room=db.get(models.Room, room_id)
+    room=await db.get(models.Room, room_id)
 
     if not room:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Room with id: {room_id} not found.")
     
     room.is_active=True
     room.status=models.RoomStatus.AVAILABLE
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await room_catalog.invalidate()
+    await db.refresh(room)
 
     return room
 
 #Update room information
 
 @router.patch("/{room_id}", response_model=models.Room)
-def update_room_info(
+async def update_room_info(
     room_id : int,
     updated_room:schemas.RoomUpdate, db:database.SessionLocal,
-    current_user: models.User=Depends(rbac.require_roles(["admin"]))):
+    current_user: schemas.Principal=Depends(rbac.require_roles(["admin"]))):
 
-    room=db.get(models.Room, room_id)
+    room=await db.get(models.Room, room_id)
 
     if not room:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Room with id: {room_id} not found.")
     
     if updated_room.room_number:
 
-        existing=db.exec(select(models.Room).where(models.Room.room_number == updated_room.room_number, models.Room.id != room_id)).first()
+        existing=(await db.exec(select(models.Room).where(models.Room.room_number == updated_room.room_number, models.Room.id != room_id))).first()
 
         if existing:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, 
@@ -145,8 +321,9 @@ def update_room_info(
     for key,value in room_data.items():
         setattr(room,key,value)
 
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await room_catalog.invalidate()
+    await db.refresh(room)
 
     return room
 
@@ -154,13 +331,13 @@ def update_room_info(
 #update room status only
 
 @router.patch("/{room_id}/status", response_model=models.Room)
-def update_room_status(
+async def update_room_status(
     room_id:int, 
     new_status: schemas.RoomStatusUpdate, 
-    db: Session = Depends(database.get_session), 
-    current_user:models.User=Depends(oauth2.get_current_user)):
+    db: AsyncSession = Depends(database.get_session), 
+    current_user:schemas.Principal=Depends(oauth2.get_current_user)):
 
-    room=db.get(models.Room, room_id)
+    room=await db.get(models.Room, room_id)
 
     if not room:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Room with id: {room_id} not found.")
@@ -170,7 +347,8 @@ def update_room_status(
     
     room.status=new_status.status
 
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await room_catalog.invalidate()
+    await db.refresh(room)
 
     return room
\ No newline at end of file
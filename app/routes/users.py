@@ -1,7 +1,7 @@
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Response,status
-from sqlmodel import Session, select
-from .. import models,schemas,rbac,database,utils,oauth2
+from sqlmodel import select
+from .. import models,schemas,rbac,database,utils,oauth2,pagination
 
 router=APIRouter(
     prefix="/users",
@@ -9,41 +9,72 @@ router=APIRouter(
 )
 
 @router.post("/",response_model=schemas.UserResponse)
-def create_user(
+async def create_user(
     user_data:schemas.UserCreate,
-    db=Depends(database.get_session)): #current_user:models.User=Depends(rbac.require_roles(["admin"]))):
+    db=Depends(database.get_session)): #current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
 
-    existing_user=db.exec(select(models.User).where(models.User.username == user_data.username)).first()
+    existing_user=(await db.exec(select(models.User).where(models.User.username == user_data.username))).first()
 
     if existing_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"User with username '{user_data.username}' already exists.")
     
-    hashed_password=utils.hash(user_data.password)
+    hashed_password=await utils.hash_in_pool(user_data.password)
 
     user=models.User(username=user_data.username, hashed_password=hashed_password, role=user_data.role)
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return user
 
 @router.get("/", response_model=List[schemas.UserResponse])
-def get_users(
-    db:database.SessionLocal,user:models.User=Depends(rbac.require_roles(["admin"]))):
-    users = db.exec(select(models.User)).all()
+async def get_users(
+    response: Response,
+    db:database.SessionLocal,user:schemas.Principal=Depends(rbac.require_roles(["admin"])),
+    page: pagination.Page=Depends(), role: Optional[models.Roles]=None):
+
+    query=select(models.User)
+
+    if role:
+        query=query.where(models.User.role == role)
+
+    users = await pagination.paginate(db, query, models.User.id, page, response)
 
     return users
 
 @router.get("/me", response_model=schemas.UserResponse)
-def get_current_user(current_user:models.User=Depends(oauth2.get_current_user)):
+async def get_current_user(current_user:schemas.Principal=Depends(oauth2.get_current_user)):
     return current_user
 
+#changing the password signs the user out everywhere else; the response carries a fresh token
+@router.put("/me/password", response_model=schemas.TokenResponse)
+async def change_password(password_data:schemas.PasswordChange,
+    db:database.SessionLocal, current_user:schemas.Principal=Depends(oauth2.get_current_user)):
+
+    user=await db.get(models.User, current_user.id)
+
+    valid, _= await utils.verify_in_pool(password_data.current_password, user.hashed_password)
+
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Credentials.")
+
+    user.hashed_password=await utils.hash_in_pool(password_data.new_password)
+    oauth2.revoke_tokens(user)
+    await db.commit()
+
+    await oauth2.invalidate_principal(user.id)
+
+    return {
+       "access_token":oauth2.get_user_token(user),
+       "token_type":"bearer"
+    }
+
 @router.get("/{id}", response_model=schemas.UserResponse)
-def get_a_user(id:int, 
-    db:database.SessionLocal,current_user:models.User=Depends(rbac.require_roles(["admin"]))):
+async def get_a_user(id:int, 
+    db:database.SessionLocal,current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
 
-    user=db.get(models.User,id)
+    user=await db.get(models.User,id)
     
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"User with id: {id} not found.")
@@ -51,17 +82,38 @@ def get_a_user(id:int,
     return user
 
 
+#tokens issued with the old role stop working
+@router.patch("/{id}/role", response_model=schemas.UserResponse)
+async def update_user_role(id:int, role_data:schemas.UserRoleUpdate,
+    db:database.SessionLocal, current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
+
+    user=await db.get(models.User, id)
+
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id: {id} not found.")
+
+    if user.role != role_data.role:
+        user.role=role_data.role
+        oauth2.revoke_tokens(user)
+        await db.commit()
+
+        await oauth2.invalidate_principal(id)
+
+    return user
+
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(id:int,
+async def delete_user(id:int,
     db:database.SessionLocal, 
-    current_user:models.User=Depends(rbac.require_roles(["admin"]))):
+    current_user:schemas.Principal=Depends(rbac.require_roles(["admin"]))):
     
-    user=db.get(models.User, id)
+    user=await db.get(models.User, id)
 
     if not user:
         return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User with id: {id} not found.")
 
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+
+    await oauth2.invalidate_principal(id)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
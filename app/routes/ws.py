@@ -0,0 +1,74 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from .. import database,oauth2
+from ..catalog import room_catalog
+from ..realtime import room_hub
+
+router=APIRouter(
+    prefix="/ws",
+    tags=["Realtime"]
+)
+
+#inactive rooms are admin-only, as on GET /rooms/ and GET /rooms/{room_id}
+async def send_snapshot(websocket:WebSocket, include_inactive:bool):
+    async with database.session_scope() as db:
+        catalog=await room_catalog.snapshot(db)
+
+    await websocket.send_json({
+        "type": "snapshot",
+        "etag": catalog.etag,
+        "rooms": [room.model_dump(mode="json") for room in catalog.rooms if include_inactive or room.is_active]})
+
+#a deactivated room reaches non-admins only as its id, so they can drop it from their list
+def visible_event(message:dict, include_inactive:bool):
+    if include_inactive or message["room"]["is_active"]:
+        return message
+    return {"type": "room_removed", "id": message["room"]["id"]}
+
+#reads until the client goes away; incoming messages are ignored
+async def wait_for_disconnect(websocket:WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+#room snapshot on connect, then a {"type": "room"} delta per status/is_active change
+#({"type": "room_removed"} for non-admins when a room is deactivated).
+#{"type": "snapshot"} is sent again whenever the client may have missed changes.
+#browsers cannot set headers on a websocket, so the bearer token comes as ?token=
+@router.websocket("/rooms")
+async def room_updates(websocket:WebSocket, token:str):
+    try:
+        principal=await oauth2.principal_from_authorization(f"Bearer {token}")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    include_inactive=principal.role == "admin"
+
+    #subscribed before the snapshot is read so no change falls in between
+    queue=room_hub.subscribe()
+    disconnected=asyncio.create_task(wait_for_disconnect(websocket))
+    try:
+        await send_snapshot(websocket, include_inactive)
+
+        while True:
+            event=asyncio.create_task(queue.get())
+            done, _=await asyncio.wait({event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+
+            if disconnected in done:
+                event.cancel()
+                break
+
+            message=event.result()
+            if message["type"] == "resync":
+                await send_snapshot(websocket, include_inactive)
+            else:
+                await websocket.send_json(visible_event(message, include_inactive))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        room_hub.unsubscribe(queue)
+        disconnected.cancel()
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, case, cast, exists, func, literal_column, select, update
+from . import database, idempotency, models, reporting
+from .catalog import room_catalog
+from .config import settings
+
+logger=logging.getLogger(__name__)
+
+#pg advisory lock key shared by every worker running the daily transitions
+TRANSITIONS_LOCK_KEY=0x504D5301
+
+ACTIVE_STATUSES=[models.ReservationStatus.RESERVED, models.ReservationStatus.CHECKED_IN]
+
+#update reservations matching criteria to new_status, batch_size rows per transaction.
+#returns the (check_in, check_out) of every updated reservation.
+async def _transition_reservations(db, criteria, new_status, batch_size:int):
+    changed=[]
+    while True:
+        batch=(
+            select(models.Reservation.id)
+            .where(criteria)
+            .order_by(models.Reservation.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery())
+
+        statement=(
+            update(models.Reservation)
+            .where(models.Reservation.id.in_(batch))
+            .values(status=new_status)
+            .returning(models.Reservation.check_in, models.Reservation.check_out)
+            .execution_options(synchronize_session=False))
+
+        rows=(await db.exec(statement)).all()
+        await db.commit()
+
+        changed.extend(rows)
+        if len(rows) < batch_size:
+            return changed
+
+#set every available/occupied room to occupied when a live reservation covers day, available otherwise.
+#rooms in maintenance or inactive are left alone. returns the number of rooms changed.
+async def _reconcile_rooms(db, day:date):
+    occupied=exists().where(
+        models.Reservation.room_id == models.Room.id,
+        models.Reservation.status.in_(ACTIVE_STATUSES),
+        func.daterange(models.Reservation.check_in, models.Reservation.check_out).op("@>")(day))
+
+    target=cast(
+        case((occupied, literal_column("'OCCUPIED'")), else_=literal_column("'AVAILABLE'")),
+        models.Room.__table__.c.status.type)
+
+    statement=(
+        update(models.Room)
+        .where(
+            models.Room.status.in_([models.RoomStatus.AVAILABLE, models.RoomStatus.OCCUPIED]),
+            models.Room.status.is_distinct_from(target))
+        .values(status=target)
+        .returning(models.Room.id)
+        .execution_options(synchronize_session=False))
+
+    rooms=(await db.exec(statement)).all()
+    await db.commit()
+    return len(rooms)
+
+#apply the transitions for day. every statement is keyed on current state, so reruns are no-ops.
+#returns None when another worker holds the lock.
+async def run_daily_transitions(day:date|None=None):
+    day=day or date.today()
+    batch_size=settings.transition_batch_size
+
+    #transaction-scoped lock, released when lock_db closes even if this worker dies mid-run
+    async with database.session_scope() as lock_db:
+        if not await lock_db.scalar(select(func.pg_try_advisory_xact_lock(TRANSITIONS_LOCK_KEY))):
+            return None
+
+        async with database.session_scope() as db:
+            #guests who never arrived
+            no_shows=await _transition_reservations(db, and_(
+                models.Reservation.status == models.ReservationStatus.RESERVED,
+                models.Reservation.check_in < day), models.ReservationStatus.CANCELLED, batch_size)
+
+            #stays that have ended, including overstays not checked out at the desk
+            check_outs=await _transition_reservations(db, and_(
+                models.Reservation.status == models.ReservationStatus.CHECKED_IN,
+                models.Reservation.check_out <= day), models.ReservationStatus.CHECKED_OUT, batch_size)
+
+            #arrivals due today hold their room, as create_reservation does for same-day bookings
+            rooms=await _reconcile_rooms(db, day)
+
+    if rooms:
+        await room_catalog.invalidate()
+
+    if settings.reports_use_rollup and no_shows:
+        await reporting.refresh_daily_rollup(
+            min(check_in for check_in, _ in no_shows),
+            max(check_out for _, check_out in no_shows))
+
+    return {"day": day, "no_shows": len(no_shows), "check_outs": len(check_outs), "rooms_updated": rooms}
+
+def _seconds_until(at, now:datetime):
+    next_run=datetime.combine(now.date(), at)
+    if next_run <= now:
+        next_run+=timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+#run the daily transitions and housekeeping at settings.daily_transitions_at, forever
+async def run_scheduler():
+    while True:
+        await asyncio.sleep(_seconds_until(settings.daily_transitions_at, datetime.now()))
+        try:
+            await run_daily_transitions()
+        except Exception:
+            logger.exception("daily status transitions failed")
+
+        try:
+            await idempotency.purge_expired(settings.transition_batch_size)
+        except Exception:
+            logger.exception("purging expired idempotency keys failed")
@@ -30,6 +30,11 @@ class RoomResponse(RoomBase):
 
     class Config:
         from_attributes=True
+
+#every room, as held by catalog.RoomCatalog
+class RoomCatalogSnapshot(SQLModel):
+    etag:str
+    rooms:List[RoomResponse]
         
 #Token
 
@@ -39,6 +44,8 @@ class TokenResponse(SQLModel):
 
 class TokenData(SQLModel):
     id:Optional[int] = None
+    role:Optional[models.Roles] = None
+    version:Optional[int] = None
 
 #User schema
 
@@ -49,6 +56,13 @@ class UserCreate(UserBase):
     password: str
     role : models.Roles
 
+class UserRoleUpdate(SQLModel):
+    role: models.Roles
+
+class PasswordChange(SQLModel):
+    current_password: str
+    new_password: str
+
 class UserResponse(UserBase):
     id:int
     role :models.Roles
@@ -56,6 +70,47 @@ class UserResponse(UserBase):
     class Config:
         from_attributes=True
 
+#authenticated user as cached by oauth2.get_current_user
+class Principal(UserBase):
+    id:int
+    role:models.Roles
+    token_version:int
+
+    class Config:
+        from_attributes=True
+
+#Rate calendar schemes
+
+class RoomRateBase(SQLModel):
+    room_type: models.RoomType
+    start_date: date
+    end_date: date
+    weekday: Optional[int]=None
+    rate: Decimal
+    priority: int=0
+
+class RoomRateCreate(RoomRateBase):
+    pass
+
+class RoomRateResponse(RoomRateBase):
+    id: int
+
+    class Config:
+        from_attributes=True
+
+#all rates as cached by rates.rate_calendar, version changes with the content
+class RateCalendarSnapshot(SQLModel):
+    version: str
+    rates: List[RoomRateResponse]
+
+class RoomQuote(SQLModel):
+    room_id: int
+    room_number: int
+    room_type: models.RoomType
+    nights: int
+    total: Decimal
+    average_nightly_rate: Decimal
+
 #Guest schema
 
 class GuestBase(SQLModel):
@@ -95,12 +150,27 @@ class ReservationUpdate(ReservationBase):
 
 class ReservationResponse(ReservationBase):
     id: int
+    quoted_total: Optional[Decimal]=None
     created_at: datetime
     status: models.ReservationStatus
 
     class Config:
         from_attributes=True
 
+#Bulk import results, errors refer to the item's position in the request
+
+class BulkItemError(SQLModel):
+    index: int
+    detail: str
+
+class GuestBulkResponse(SQLModel):
+    created: List[GuestResponse]
+    errors: List[BulkItemError]
+
+class ReservationBulkResponse(SQLModel):
+    created: List[ReservationResponse]
+    errors: List[BulkItemError]
+
 #Bill schemes
 
 class BillBase(SQLModel):
@@ -116,4 +186,34 @@ class BillResponse(BillBase):
     created_at: datetime
 
     class Config:
-        from_attributes=True
\ No newline at end of file
+        from_attributes=True
+
+class BillLedgerEntry(SQLModel):
+    paid: bool
+    bills: int
+    total_amount: Decimal
+
+#Report schemes
+
+class OccupancyPoint(SQLModel):
+    period: date
+    room_nights_available: int
+    room_nights_sold: int
+    occupancy_rate: Decimal
+
+class RevenuePoint(SQLModel):
+    period: date
+    room_nights_sold: int
+    revenue: Decimal
+    adr: Decimal
+    revpar: Decimal
+
+#Expanded responses, nested fields are only present when named in ?expand=
+
+class ReservationDetailResponse(ReservationResponse):
+    guest: Optional[GuestResponse]=None
+    room: Optional[RoomResponse]=None
+    bill: Optional[BillResponse]=None
+
+class GuestDetailResponse(GuestResponse):
+    reservations: Optional[List[ReservationResponse]]=None
\ No newline at end of file
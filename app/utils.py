@@ -1,7 +1,27 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+from fastapi import HTTPException, Response, status
 from passlib.context import CryptContext
+from pydantic import TypeAdapter
+from sqlalchemy import and_, func, literal_column
+from sqlalchemy.orm import joinedload, selectinload
 from . import models
+from .config import settings
 
-pwd_context=CryptContext(schemes=["bcrypt"], deprecated=["auto"])
+#min/max pinned to the configured cost so hashes made with any other cost need an update
+pwd_context=CryptContext(schemes=["bcrypt"], deprecated=["auto"],
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds)
+
+#bcrypt releases the GIL, so a small thread pool hashes in parallel without blocking the event loop.
+#the semaphore caps running + queued jobs; past that we shed load instead of queueing forever.
+_hash_executor=ThreadPoolExecutor(max_workers=settings.hash_workers, thread_name_prefix="bcrypt")
+_hash_slots=asyncio.Semaphore(settings.hash_workers + settings.hash_queue_size)
 
 def hash(password):
     return pwd_context.hash(password)
@@ -9,9 +29,79 @@ def hash(password):
 def verify(plain_password,hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+async def _run_hashing(func, *args):
+    if _hash_slots.locked():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many password checks in progress, try again shortly.", headers={"Retry-After":"1"})
+
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+
+async def hash_in_pool(password):
+    return await _run_hashing(hash, password)
+
+#returns (valid, new_hash); new_hash is set when the stored hash used a different cost
+async def verify_in_pool(plain_password,hashed_password):
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def calculate_bill_total(reservation:models.Reservation):
+    if reservation.quoted_total is not None:
+        return Decimal(reservation.quoted_total).quantize(Decimal("0.01"))
+
     nights= (reservation.check_out - reservation.check_in).days
 
-    total=nights * float(reservation.per_night_rate)
+    total=nights * Decimal(reservation.per_night_rate)
     
-    return total
\ No newline at end of file
+    return total.quantize(Decimal("0.01"))
+
+#reservations holding their room at some point in [check_in, check_out).
+#matches the reservation_room_no_overlap exclusion constraint so postgres can answer it from that GiST index.
+def stay_overlaps(check_in:date, check_out:date):
+    return and_(
+        models.Reservation.status != literal_column("'CANCELLED'"),
+        func.daterange(models.Reservation.check_in, models.Reservation.check_out).op("&&")(func.daterange(check_in, check_out)))
+
+#?expand=guest,room -> (names, loader options). many-to-one is joined into the same query,
+#collections take one extra IN query, so the statement count does not grow with the rows returned.
+def expand_options(expand:Optional[str], relationships:dict):
+    names=[name.strip() for name in (expand or "").split(",") if name.strip()]
+
+    unknown=set(names) - relationships.keys()
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot expand {', '.join(sorted(unknown))}. Choose from {', '.join(relationships)}.")
+
+    options=[]
+    for name in names:
+        relationship=relationships[name]
+        options.append(selectinload(relationship) if relationship.property.uselist else joinedload(relationship))
+
+    return names, options
+
+#builds detail_schema from obj reading only the expanded relationships, never touching lazy ones
+def expanded_response(detail_schema, base_schema, obj, names):
+    data=base_schema.model_validate(obj).model_dump()
+    data.update({name: getattr(obj, name) for name in names})
+    return detail_schema.model_validate(data)
+
+@functools.cache
+def _list_adapter(schema):
+    return TypeAdapter(List[schema])
+
+#schema instance from a loaded row without validation; the database already enforced the types
+def trusted_model(schema, obj):
+    return schema.model_construct(**{name: getattr(obj, name) for name in schema.model_fields})
+
+#items (schema instances) serialized to a JSON array in a single pydantic-core pass.
+#returning a Response skips FastAPI's response_model re-validation and jsonable_encoder;
+#headers already set on response (cursor, ETag) are carried over.
+def json_list_response(schema, items, response:Response, exclude_unset:bool=False):
+    content=Response(_list_adapter(schema).dump_json(items, exclude_unset=exclude_unset), media_type="application/json")
+    content.raw_headers.extend(response.raw_headers)
+    return content
+
+#list counterpart of expanded_response
+def expanded_list_response(detail_schema, base_schema, objs, names, response:Response):
+    if names:
+        items=[expanded_response(detail_schema, base_schema, obj, names) for obj in objs]
+        return json_list_response(detail_schema, items, response, exclude_unset=True)
+
+    return json_list_response(base_schema, [trusted_model(base_schema, obj) for obj in objs], response)
@@ -0,0 +1,91 @@
+"""Fire parallel bookings for the same room and dates at the API.
+
+Exactly one booking per round must succeed; every other request must be
+rejected with 409. Reports correctness plus latency percentiles as JSON.
+
+    python -m benchmarks.booking_contention --username admin --password secret --concurrency 50 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from app.main import app
+
+
+def percentile(samples, pct):
+    ordered=sorted(samples)
+    if not ordered:
+        return 0.0
+    index=min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def login(client, username, password):
+    response=await client.post("/login/", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def book(client, headers, payload):
+    start=time.perf_counter()
+    response=await client.post("/reservations/", json=payload, headers=headers)
+    return response.status_code, time.perf_counter() - start
+
+
+async def run(args):
+    transport=httpx.ASGITransport(app=app) if not args.base_url else None
+    async with httpx.AsyncClient(transport=transport, base_url=args.base_url or "http://bench", timeout=60) as client:
+        headers=await login(client, args.username, args.password)
+
+        suffix=random.randint(100000, 999999)
+        room=(await client.post("/rooms/", headers=headers, json={
+            "room_number": suffix, "room_type": "double", "capacity": 2, "price": "120.00", "status": "available"})).json()
+        guest=(await client.post("/guests/", headers=headers, json={
+            "name": "Contention Bench", "phone": str(suffix), "email": f"bench-{suffix}@example.com"})).json()
+
+        latencies=[]
+        violations=[]
+        for round_no in range(args.rounds):
+            check_in=date.today() + timedelta(days=30 + 3 * round_no)
+            payload={
+                "guest_id": guest["id"], "room_id": room["id"], "no_of_guests": 1, "per_night_rate": "120.00",
+                "check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=2)).isoformat()}
+
+            results=await asyncio.gather(*(book(client, headers, payload) for _ in range(args.concurrency)))
+            codes=[code for code, _ in results]
+            latencies.extend(elapsed for _, elapsed in results)
+
+            if codes.count(200) != 1 or codes.count(409) != args.concurrency - 1:
+                violations.append({"round": round_no, "status_codes": sorted(codes)})
+
+    report={
+        "concurrency": args.concurrency,
+        "rounds": args.rounds,
+        "requests": len(latencies),
+        "correct": not violations,
+        "violations": violations,
+        "latency_ms": {pct: round(percentile(latencies, int(pct[1:])) * 1000, 2) for pct in ("p50", "p95", "p99")},
+        "latency_ms_max": round(max(latencies) * 1000, 2),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    report=asyncio.run(run(parser.parse_args()))
+    raise SystemExit(0 if report["correct"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compare two benchmarks.suite result files and flag regressions.
+
+Exits non-zero when any scenario's p95 latency grew, or its throughput
+dropped, by more than the threshold.
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+
+
+def change(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(baseline, candidate, threshold):
+    rows=[]
+    for name in sorted(set(baseline["scenarios"]) & set(candidate["scenarios"])):
+        old, new=baseline["scenarios"][name], candidate["scenarios"][name]
+        p95=change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        throughput=change(old["throughput_rps"], new["throughput_rps"])
+        rows.append({
+            "scenario": name,
+            "p50_ms": (old["latency_ms"]["p50"], new["latency_ms"]["p50"]),
+            "p95_ms": (old["latency_ms"]["p95"], new["latency_ms"]["p95"]),
+            "p99_ms": (old["latency_ms"]["p99"], new["latency_ms"]["p99"]),
+            "throughput_rps": (old["throughput_rps"], new["throughput_rps"]),
+            "p95_change_pct": round(p95, 1),
+            "throughput_change_pct": round(throughput, 1),
+            "regressed": p95 > threshold or throughput < -threshold or new["unexpected"] > old["unexpected"],
+        })
+    return rows
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    args=parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline=json.load(file)
+    with open(args.candidate) as file:
+        candidate=json.load(file)
+
+    rows=compare(baseline, candidate, args.threshold)
+    print(f"{'scenario':32} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'rps':>19}")
+    for row in rows:
+        cells=" ".join(f"{old:>8} {new:>8}" for old, new in (row["p50_ms"], row["p95_ms"], row["p99_ms"], row["throughput_rps"]))
+        print(f"{row['scenario']:32} {cells}  {'REGRESSED' if row['regressed'] else ''}")
+
+    raise SystemExit(1 if any(row["regressed"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
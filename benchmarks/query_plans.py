@@ -0,0 +1,103 @@
+"""Check that the router queries are served by the intended indexes.
+
+Runs EXPLAIN on the statements the routers build and fails when a query
+does not touch its expected index. Use --seed to load a large synthetic
+dataset first so the planner has realistic statistics.
+
+    python -m benchmarks.query_plans --seed --rooms 2000 --guests 200000
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlmodel import select
+
+from app import models, utils
+from app.database import DATABASE_URL
+from app.routes.reservations import filter_reservations
+from benchmarks import seed as seeding
+
+PAGE=101
+
+
+def checks():
+    today=date.today()
+    stay_in, stay_out=today + timedelta(days=10), today + timedelta(days=13)
+
+    booked=select(models.Reservation.id).where(
+        models.Reservation.room_id == models.Room.id,
+        utils.stay_overlaps(stay_in, stay_out))
+
+    return [
+        ("get_all_rooms (active, by status)", "ix_rooms_active_status",
+            select(models.Room).where(models.Room.is_active == True, models.Room.status == models.RoomStatus.MAINTENANCE)
+            .order_by(models.Room.room_number).limit(PAGE)),
+        ("get_all_rooms (active page)", "ix_rooms_active_room_number",
+            select(models.Room).where(models.Room.is_active == True, models.Room.room_number > 100)
+            .order_by(models.Room.room_number).limit(PAGE)),
+        ("get_available_rooms", "reservation_room_no_overlap",
+            select(models.Room).where(models.Room.is_active == True, ~booked.exists()).order_by(models.Room.room_number)),
+        ("get_all_reservations (staff)", "ix_reservation_check_out_status",
+            select(models.Reservation).where(models.Reservation.check_out >= today + timedelta(days=60))),
+        ("get_all_reservations (room and dates)", "ix_reservation_room_check_in",
+            filter_reservations(select(models.Reservation), today - timedelta(days=30), today, None, 1)
+            .order_by(models.Reservation.id).limit(PAGE)),
+        ("reservations of a guest", "ix_reservation_guest_id",
+            select(models.Reservation).where(models.Reservation.guest_id == 1)),
+        ("get_all_guests (email prefix)", "ix_guests_email_pattern",
+            select(models.Guest).where(models.Guest.email.startswith("guest1234.", autoescape=True)).order_by(models.Guest.id).limit(PAGE)),
+        ("get_all_guests (phone prefix)", "ix_guests_phone_pattern",
+            select(models.Guest).where(models.Guest.phone.startswith("9800001", autoescape=True)).order_by(models.Guest.id).limit(PAGE)),
+        ("search_guests (name similarity)", "ix_guests_name_trgm",
+            select(models.Guest).where(models.Guest.name.op("%>")("Gest 12345")).limit(20)),
+        ("search_guests (name prefix)", "ix_guests_name_trgm",
+            select(models.Guest).where(models.Guest.name.ilike("guest 1234%", escape="/")).limit(20)),
+        ("generate_bills", "ix_reservation_check_out_status",
+            select(models.Reservation.id).where(
+                models.Reservation.status == models.ReservationStatus.CHECKED_OUT,
+                models.Reservation.check_out == today - timedelta(days=1))),
+        ("get_all_bills (unpaid)", "ix_bills_paid_id",
+            select(models.Bill).where(models.Bill.paid == False).order_by(models.Bill.id).limit(PAGE)),
+        ("bill of a reservation", "bills_reservation_id_key",
+            select(models.Bill).where(models.Bill.reservation_id == 1)),
+    ]
+
+
+def index_names(plan):
+    names=set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names|=index_names(child)
+    return names
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", action="store_true", help="load a synthetic dataset before checking")
+    seeding.add_arguments(parser)
+    args=parser.parse_args()
+
+    engine=create_engine(DATABASE_URL)
+
+    if args.seed:
+        with engine.begin() as connection:
+            print(json.dumps(seeding.seed(connection, args.rooms, args.guests, args.history_days)))
+
+    failures=0
+    with engine.connect() as connection:
+        for name, expected, statement in checks():
+            sql=str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan=connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar_one()[0]["Plan"]
+            used=index_names(plan)
+
+            ok=expected in used
+            failures+=not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: expected {expected}, used {sorted(used) or 'no index'}")
+
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
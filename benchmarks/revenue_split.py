@@ -0,0 +1,90 @@
+"""Check that a stay's nightly revenue adds up to its quoted total.
+
+Books stays whose quoted totals do not divide evenly by their nights on a
+throwaway room far in the future, then sums their revenue from the live
+occupancy query and from the daily_occupancy rollup. Both must equal the
+quoted total to the cent. Everything runs in one transaction that is rolled
+back; exits non-zero on a mismatch.
+
+    python -m benchmarks.revenue_split
+"""
+import argparse
+import json
+import random
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import create_engine, func, insert, select
+
+from app import models, reporting
+from app.database import DATABASE_URL
+
+
+#(quoted total, nights)
+STAYS=[
+    (Decimal("100.00"), 3),
+    (Decimal("1650.00"), 7),
+    (Decimal("349.99"), 6),
+    (Decimal("0.05"), 2),
+]
+
+
+def revenue(connection, nights, start, end):
+    nights=nights(start, end).subquery("nights")
+    return connection.execute(select(func.coalesce(func.sum(nights.c.revenue), 0))).scalar_one()
+
+
+def check(connection, start, quoted_total, nights):
+    end=start + timedelta(days=nights)
+
+    live_before=revenue(connection, reporting._live_nights, start, end)
+    connection.execute(reporting.rollup_refresh_statement(start, end))
+    rollup_before=revenue(connection, reporting._rollup_nights, start, end)
+
+    room_id=connection.execute(insert(models.Room).values(
+        room_number=random.randint(10**8, 2 * 10**8), room_type=models.RoomType.SINGLE, capacity=1,
+        price=Decimal("100.00"), status=models.RoomStatus.AVAILABLE, is_active=True).returning(models.Room.id)).scalar_one()
+    guest_id=connection.execute(insert(models.Guest).values(
+        name="Revenue Check", phone="9800000000", email=f"revenue.{room_id}@example.com").returning(models.Guest.id)).scalar_one()
+    connection.execute(insert(models.Reservation).values(
+        guest_id=guest_id, room_id=room_id, check_in=start, check_out=end, no_of_guests=1,
+        per_night_rate=(quoted_total / nights).quantize(Decimal("0.01")), quoted_total=quoted_total,
+        status=models.ReservationStatus.RESERVED, created_at=datetime.now(timezone.utc)))
+
+    live=revenue(connection, reporting._live_nights, start, end) - live_before
+    connection.execute(reporting.rollup_refresh_statement(start, end))
+    rollup=revenue(connection, reporting._rollup_nights, start, end) - rollup_before
+
+    return {
+        "quoted_total": str(quoted_total),
+        "nights": nights,
+        "live": str(live),
+        "rollup": str(rollup),
+        "ok": live == quoted_total and rollup == quoted_total,
+    }
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2999, 1, 1), help="first night of the test stays")
+    args=parser.parse_args()
+
+    engine=create_engine(DATABASE_URL)
+
+    with engine.connect() as connection:
+        transaction=connection.begin()
+        try:
+            results=[]
+            start=args.start
+            for quoted_total, nights in STAYS:
+                results.append(check(connection, start, quoted_total, nights))
+                start+=timedelta(days=nights + 1)
+        finally:
+            transaction.rollback()
+
+    print(json.dumps(results, indent=2))
+    raise SystemExit(0 if all(result["ok"] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
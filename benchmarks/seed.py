@@ -0,0 +1,99 @@
+"""Seed a database with synthetic rooms, guests, years of reservations and bills.
+
+Every run adds a fresh batch tagged with a random suffix, so it can be
+pointed at a database that already holds data.
+
+    python -m benchmarks.seed --rooms 500 --guests 200000 --history-days 1095
+"""
+import argparse
+import json
+import random
+
+from sqlalchemy import create_engine, text
+
+from app.database import DATABASE_URL
+
+
+ROOMS_SQL=text("""
+INSERT INTO rooms (room_number, room_type, capacity, price, status, is_active)
+SELECT :base + n,
+       (CASE WHEN n % 2 = 0 THEN 'DOUBLE' ELSE 'SINGLE' END)::roomtype,
+       1 + n % 4,
+       80 + (n % 5) * 20,
+       'AVAILABLE'::roomstatus,
+       n % 50 <> 0
+FROM generate_series(1, :rooms) AS n
+""")
+
+GUESTS_SQL=text("""
+INSERT INTO guests (name, phone, email)
+SELECT 'Guest ' || n, '98' || lpad(n::text, 8, '0'), 'guest' || n || '.' || :tag || '@example.com'
+FROM generate_series(1, :guests) AS n
+""")
+
+# one 3-night stay every 4 days per room, so stays never overlap
+RESERVATIONS_SQL=text("""
+INSERT INTO reservation (guest_id, room_id, check_in, check_out, no_of_guests, per_night_rate, created_at, status)
+SELECT g.min_id + floor(random() * g.cnt)::int,
+       r.id,
+       d::date,
+       d::date + 3,
+       1,
+       r.price,
+       d - interval '14 days',
+       (CASE
+            WHEN random() < 0.05 THEN 'CANCELLED'
+            WHEN d::date + 3 <= current_date THEN 'CHECKED_OUT'
+            WHEN d::date <= current_date THEN 'CHECKED_IN'
+            ELSE 'RESERVED'
+        END)::reservationstatus
+FROM rooms AS r
+CROSS JOIN generate_series(current_date - make_interval(days => :history_days), current_date + 90, interval '4 days') AS d
+CROSS JOIN (SELECT min(id) AS min_id, count(*) AS cnt FROM guests WHERE email LIKE '%.' || :tag || '@example.com') AS g
+WHERE r.room_number > :base
+""")
+
+BILLS_SQL=text("""
+INSERT INTO bills (reservation_id, total_amount, paid, created_at)
+SELECT res.id, (res.check_out - res.check_in) * res.per_night_rate, random() < 0.9, res.check_out
+FROM reservation AS res
+JOIN rooms AS r ON r.id = res.room_id
+WHERE r.room_number > :base AND res.status = 'CHECKED_OUT'
+""")
+
+
+def seed(connection, rooms, guests, history_days):
+    tag=f"{random.getrandbits(32):08x}"
+    base=connection.execute(text("SELECT coalesce(max(room_number), 0) FROM rooms")).scalar_one()
+
+    counts={}
+    counts["rooms"]=connection.execute(ROOMS_SQL, {"base": base, "rooms": rooms}).rowcount
+    counts["guests"]=connection.execute(GUESTS_SQL, {"tag": tag, "guests": guests}).rowcount
+    counts["reservations"]=connection.execute(RESERVATIONS_SQL, {"base": base, "tag": tag, "history_days": history_days}).rowcount
+    counts["bills"]=connection.execute(BILLS_SQL, {"base": base}).rowcount
+
+    for table in ("rooms", "guests", "reservation", "bills"):
+        connection.execute(text(f"ANALYZE {table}"))
+
+    return {"tag": tag, "room_number_base": base, **counts}
+
+
+def add_arguments(parser):
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--guests", type=int, default=100000)
+    parser.add_argument("--history-days", type=int, default=3 * 365)
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    args=parser.parse_args()
+
+    with create_engine(DATABASE_URL).begin() as connection:
+        summary=seed(connection, args.rooms, args.guests, args.history_days)
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
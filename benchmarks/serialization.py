@@ -0,0 +1,79 @@
+"""Time list serialization: the response_model path against the direct dump_json path.
+
+Builds in-memory Reservation and Guest rows (no database needed) and renders
+them the way get_all_reservations/get_all_guests used to (validate through the
+response schemas, jsonable_encoder, json.dumps) and the way they do now
+(utils.expanded_list_response). Prints JSON timings.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app import models, schemas, utils
+
+
+def reservations(rows):
+    now=datetime.now(timezone.utc)
+    return [models.Reservation(
+        id=n, guest_id=n, room_id=n % 500, check_in=date.today() + timedelta(days=n % 90),
+        check_out=date.today() + timedelta(days=n % 90 + 3), no_of_guests=2, per_night_rate=Decimal("120.00"),
+        created_at=now, status=models.ReservationStatus.RESERVED) for n in range(1, rows + 1)]
+
+
+def guests(rows):
+    return [models.Guest(id=n, name=f"Guest {n}", phone=f"98{n:08d}", email=f"guest{n}@example.com") for n in range(1, rows + 1)]
+
+
+#what FastAPI did with the old list of detail models: validate against response_model, encode, dump
+def response_model_path(detail_schema, base_schema, objs):
+    items=[utils.expanded_response(detail_schema, base_schema, obj, []) for obj in objs]
+    validated=TypeAdapter(List[detail_schema]).validate_python(items, from_attributes=True)
+    content=jsonable_encoder(validated, exclude_unset=True)
+    return JSONResponse(content).body
+
+
+def direct_path(detail_schema, base_schema, objs):
+    return utils.expanded_list_response(detail_schema, base_schema, objs, [], Response()).body
+
+
+def measure(function, repeat, *args):
+    function(*args)
+    start=time.perf_counter()
+    for _ in range(repeat):
+        function(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args=parser.parse_args()
+
+    cases={
+        "reservations": (schemas.ReservationDetailResponse, schemas.ReservationResponse, reservations(args.rows)),
+        "guests": (schemas.GuestDetailResponse, schemas.GuestResponse, guests(args.rows)),
+    }
+
+    report={}
+    for name, (detail_schema, base_schema, objs) in cases.items():
+        assert json.loads(response_model_path(detail_schema, base_schema, objs)) == json.loads(direct_path(detail_schema, base_schema, objs))
+        before=measure(response_model_path, args.repeat, detail_schema, base_schema, objs)
+        after=measure(direct_path, args.repeat, detail_schema, base_schema, objs)
+        report[name]={"rows": args.rows, "response_model_ms": round(before, 3), "direct_ms": round(after, 3), "speedup": round(before / after, 2)}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Check that ?expand= list requests run a constant number of SQL statements.
+
+Requests each expanded list endpoint at a small and a large page size and
+counts the statements it executes with a before_cursor_execute listener.
+Eager loading must keep the count independent of the number of rows
+returned; exits non-zero when it grows. Use --seed to make sure the larger
+page is actually full.
+
+    python -m benchmarks.statement_counts --username admin --password secret --seed --rooms 50 --guests 500
+"""
+import argparse
+import asyncio
+import json
+
+import httpx
+from sqlalchemy import create_engine, event
+
+from app import database
+from app.main import app
+from benchmarks.booking_contention import login
+from benchmarks import seed as seeding
+
+
+ENDPOINTS=[
+    ("/reservations/", "guest,room,bill"),
+    ("/guests/", "reservations"),
+]
+
+statements=0
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements+=1
+
+
+async def measure(client, headers, path, expand, limit):
+    global statements
+
+    statements=0
+    response=await client.get(path, params={"expand": expand, "limit": limit}, headers=headers)
+    response.raise_for_status()
+    return {"limit": limit, "rows": len(response.json()), "statements": statements}
+
+
+async def run(args):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        headers=await login(client, args.username, args.password)
+
+        results=[]
+        for path, expand in ENDPOINTS:
+            #first request warms the principal cache so authentication does not count
+            await measure(client, headers, path, expand, args.small)
+
+            small=await measure(client, headers, path, expand, args.small)
+            large=await measure(client, headers, path, expand, args.large)
+            results.append({
+                "path": path,
+                "expand": expand,
+                "small": small,
+                "large": large,
+                "constant": small["statements"] == large["statements"],
+                "large_page_filled": large["rows"] > small["rows"],
+            })
+
+    return results
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=500)
+    parser.add_argument("--seed", action="store_true", help="load a synthetic dataset before checking")
+    seeding.add_arguments(parser)
+    args=parser.parse_args()
+
+    if args.seed:
+        with create_engine(database.DATABASE_URL).begin() as connection:
+            print(json.dumps(seeding.seed(connection, args.rooms, args.guests, args.history_days)))
+
+    #list routes may read from the replica
+    for engine in (database.engine, database.replica_engine):
+        if engine is not None:
+            event.listen(getattr(engine, "sync_engine", engine), "before_cursor_execute", count_statement)
+
+    results=asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+
+    for result in results:
+        if not result["large_page_filled"]:
+            print(f"warning: {result['path']} returned no more rows at limit={args.large}, seed more data for a meaningful check")
+
+    raise SystemExit(0 if all(result["constant"] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
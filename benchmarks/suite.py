@@ -0,0 +1,170 @@
+"""Benchmark the API hot paths and write the results as JSON.
+
+Optionally seeds the database first (same options as benchmarks.seed), then
+drives every scenario through the in-process app (or a running server) with
+a fixed number of concurrent clients and reports throughput and latency
+percentiles. Compare two result files with benchmarks.compare.
+
+    python -m benchmarks.suite --username admin --password secret --seed --rooms 500 --output before.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import create_engine
+
+from app.config import settings
+from app.database import DATABASE_URL
+from app.main import app
+from benchmarks.booking_contention import login, percentile
+from benchmarks.seed import add_arguments as add_seed_arguments, seed
+
+
+#name -> (method, request factory, acceptable status codes).
+#a factory gets the shared context and the request index and returns (url, request kwargs).
+def scenarios(ctx, concurrency):
+    def contended_booking(index):
+        #every batch of `concurrency` consecutive requests competes for the same room and nights
+        check_in=ctx["first_night"] + timedelta(days=3 * (index // concurrency))
+        return "/reservations/", {"json": {
+            "guest_id": ctx["guest_id"], "room_id": ctx["room_id"], "no_of_guests": 1, "per_night_rate": "120.00",
+            "check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=2)).isoformat()}}
+
+    return {
+        "login": ("POST", lambda index: ("/login/", {"data": ctx["credentials"]}), {200}),
+        "current_user": ("GET", lambda index: ("/users/me", {}), {200}),
+        "guest_by_id": ("GET", lambda index: (f"/guests/{ctx['guest_id']}", {}), {200}),
+        "rooms_list": ("GET", lambda index: ("/rooms/", {}), {200, 304}),
+        "reservations_list": ("GET", lambda index: ("/reservations/", {"params": {"limit": 100}}), {200}),
+        "reservations_list_expanded": ("GET", lambda index: ("/reservations/", {"params": {"limit": 100, "expand": "guest,room"}}), {200}),
+        "guests_list": ("GET", lambda index: ("/guests/", {"params": {"limit": 100}}), {200}),
+        "reservation_create_contended": ("POST", contended_booking, {200, 409}),
+    }
+
+
+async def setup(client, args):
+    headers=await login(client, args.username, args.password)
+    suffix=random.randint(100000, 999999)
+
+    room=(await client.post("/rooms/", headers=headers, json={
+        "room_number": suffix, "room_type": "double", "capacity": 2, "price": "120.00", "status": "available"})).json()
+    guest=(await client.post("/guests/", headers=headers, json={
+        "name": "Suite Bench", "phone": str(suffix), "email": f"suite-{suffix}@example.com"})).json()
+
+    return {
+        "headers": headers,
+        "credentials": {"username": args.username, "password": args.password},
+        "room_id": room["id"],
+        "guest_id": guest["id"],
+        #far enough ahead of any seeded stay
+        "first_night": date.today() + timedelta(days=400 + random.randint(0, 3650)),
+    }
+
+
+async def run_scenario(client, ctx, method, factory, expected, requests, concurrency, warmup):
+    for index in range(warmup):
+        url, kwargs=factory(-1 - index)
+        await client.request(method, url, headers=ctx["headers"], **kwargs)
+
+    counter=itertools.count()
+    latencies=[]
+    statuses=Counter()
+
+    async def worker():
+        while (index := next(counter)) < requests:
+            url, kwargs=factory(index)
+            start=time.perf_counter()
+            response=await client.request(method, url, headers=ctx["headers"], **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code]+=1
+
+    start=time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed=time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": {pct: round(percentile(latencies, int(pct[1:])) * 1000, 2) for pct in ("p50", "p95", "p99")},
+        "latency_ms_max": round(max(latencies) * 1000, 2),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "unexpected": sum(count for code, count in statuses.items() if code not in expected),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    transport=httpx.ASGITransport(app=app) if not args.base_url else None
+    async with httpx.AsyncClient(transport=transport, base_url=args.base_url or "http://bench", timeout=120) as client:
+        ctx=await setup(client, args)
+        available=scenarios(ctx, args.concurrency)
+        selected=args.scenario or list(available)
+
+        results={}
+        for name in selected:
+            method, factory, expected=available[name]
+            #bcrypt makes logins orders of magnitude slower than everything else
+            requests=args.login_requests if name == "login" else args.requests
+            results[name]=await run_scenario(client, ctx, method, factory, expected, requests, args.concurrency, args.warmup)
+
+    return results
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenario", action="append", help="run only this scenario (repeatable)")
+    parser.add_argument("--seed", action="store_true", help="seed the database before running")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="write the results here instead of stdout")
+    add_seed_arguments(parser)
+    args=parser.parse_args()
+
+    seeded=None
+    if args.seed:
+        with create_engine(DATABASE_URL).begin() as connection:
+            seeded=seed(connection, args.rooms, args.guests, args.history_days)
+
+    report={
+        "meta": {
+            "revision": git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "async_database": settings.async_database,
+            "pool_size": settings.database_pool_size,
+            "target": args.base_url or "in-process",
+            "seed": seeded,
+        },
+        "scenarios": asyncio.run(run(args)),
+    }
+
+    output=json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()